@@ -1,7 +1,463 @@
+import _thread
+import os
+import struct
+
+if __package__:
+    from ._lazy import optional_module
+else:
+    from _lazy import optional_module
+
+# NumPy is optional and only imported by the first batched operation, so
+# importing this module stays cheap; np is None when it is not installed
+np = optional_module("numpy")
+
+# A 16-byte block as four big-endian 32-bit column words
+_BLOCK = struct.Struct(">4I")
+
+
+def _xtime(a):
+    """Multiply a byte by x (i.e. by 0x02) in GF(2^8)."""
+    a <<= 1
+    if a & 0x100:
+        a ^= 0x11B  # Reduce by x^8 + x^4 + x^3 + x + 1
+    return a
+
+
+def _build_t_tables(sbox, inv_sbox):
+    """
+    Build the encryption (Te0..Te3) and decryption (Td0..Td3) T-tables.
+    
+    Te0[x] packs the MixColumns column (2s, s, s, 3s) for s = sbox[x] into a
+    big-endian 32-bit word, and Td0[x] packs (14s, 9s, 13s, 11s) for
+    s = inv_sbox[x]. Te1..Te3 and Td1..Td3 are byte rotations of those.
+    """
+    def ror8(w):
+        return ((w >> 8) | (w << 24)) & 0xFFFFFFFF
+
+    te0 = []
+    td0 = []
+    for x in range(256):
+        s = sbox[x]
+        s2 = _xtime(s)
+        te0.append((s2 << 24) | (s << 16) | (s << 8) | (s2 ^ s))
+        # 9s, 11s, 13s and 14s from the doublings of s
+        s = inv_sbox[x]
+        s2 = _xtime(s)
+        s4 = _xtime(s2)
+        s8 = _xtime(s4)
+        td0.append(((s8 ^ s4 ^ s2) << 24) | ((s8 ^ s) << 16) |
+                   ((s8 ^ s4 ^ s) << 8) | (s8 ^ s2 ^ s))
+
+    te = [tuple(te0)]
+    td = [tuple(td0)]
+    for _ in range(3):
+        te.append(tuple(ror8(w) for w in te[-1]))
+        td.append(tuple(ror8(w) for w in td[-1]))
+    return tuple(te) + tuple(td)
+
+
+# (sbox, inv_sbox, shift_rows, inv_shift_rows) arrays, built by _np_tables() on first use
+_np_tables_cache = None
+
+
+def _np_tables():
+    """Return the S-boxes and (Inv)ShiftRows gather indices as NumPy arrays."""
+    global _np_tables_cache
+    if _np_tables_cache is None:
+        # Byte i of a block is row i % 4, column i // 4 of the state
+        _np_tables_cache = (
+            np.array(AES.sbox, dtype=np.uint8),
+            np.array(AES.inv_sbox, dtype=np.uint8),
+            np.array([4 * ((i // 4 + i % 4) % 4) + i % 4 for i in range(16)], dtype=np.intp),
+            np.array([4 * ((i // 4 - i % 4) % 4) + i % 4 for i in range(16)], dtype=np.intp),
+        )
+    return _np_tables_cache
+
+
+def _np_xtime(a):
+    """Multiply every byte of a uint8 array by x in GF(2^8)."""
+    return (a << 1) ^ ((a >> 7) * np.uint8(0x1B))
+
+
+def _np_mix_columns(state):
+    """MixColumns over an (N, 16) uint8 state array."""
+    cols = state.reshape(-1, 4, 4)
+    total = cols[:, :, 0] ^ cols[:, :, 1] ^ cols[:, :, 2] ^ cols[:, :, 3]
+    # Row r becomes a_r ^ (a0 ^ a1 ^ a2 ^ a3) ^ xtime(a_r ^ a_{r+1})
+    mixed = cols ^ total[:, :, None] ^ _np_xtime(cols ^ cols[:, :, [1, 2, 3, 0]])
+    return mixed.reshape(-1, 16)
+
+
+def _np_inv_mix_columns(state):
+    """InvMixColumns over an (N, 16) uint8 state array."""
+    cols = state.reshape(-1, 4, 4)
+    # Pre-multiply rows by (x^2)(a_r ^ a_{r+2}), after which MixColumns gives InvMixColumns
+    cols = cols ^ _np_xtime(_np_xtime(cols ^ cols[:, :, [2, 3, 0, 1]]))
+    return _np_mix_columns(cols.reshape(-1, 16))
+
+
+def _bs_sbox(u):
+    """
+    SubBytes as a Boolean circuit over eight bit planes.
+    
+    This is the 113-gate, depth-16 circuit of Boyar and Peralta: a linear
+    top layer, a shared nonlinear core computing the GF(2^8) inverse (32
+    ANDs), and a linear bottom layer that also applies the affine map.
+    Planes are given and returned most significant bit first; any arrays
+    supporting ^, & and ~ work, so every gate acts on all bytes at once.
+    """
+    u0, u1, u2, u3, u4, u5, u6, u7 = u
+    t1 = u0 ^ u3
+    t2 = u0 ^ u5
+    t3 = u0 ^ u6
+    t4 = u3 ^ u5
+    t5 = u4 ^ u6
+    t6 = t1 ^ t5
+    t7 = u1 ^ u2
+    t8 = u7 ^ t6
+    t9 = u7 ^ t7
+    t10 = t6 ^ t7
+    t11 = u1 ^ u5
+    t12 = u2 ^ u5
+    t13 = t3 ^ t4
+    t14 = t6 ^ t11
+    t15 = t5 ^ t11
+    t16 = t5 ^ t12
+    t17 = t9 ^ t16
+    t18 = u3 ^ u7
+    t19 = t7 ^ t18
+    t20 = t1 ^ t19
+    t21 = u6 ^ u7
+    t22 = t7 ^ t21
+    t23 = t2 ^ t22
+    t24 = t2 ^ t10
+    t25 = t20 ^ t17
+    t26 = t3 ^ t16
+    t27 = t1 ^ t12
+    m1 = t13 & t6
+    m2 = t23 & t8
+    m3 = t14 ^ m1
+    m4 = t19 & u7
+    m5 = m4 ^ m1
+    m6 = t3 & t16
+    m7 = t22 & t9
+    m8 = t26 ^ m6
+    m9 = t20 & t17
+    m10 = m9 ^ m6
+    m11 = t1 & t15
+    m12 = t4 & t27
+    m13 = m12 ^ m11
+    m14 = t2 & t10
+    m15 = m14 ^ m11
+    m16 = m3 ^ m2
+    m17 = m5 ^ t24
+    m18 = m8 ^ m7
+    m19 = m10 ^ m15
+    m20 = m16 ^ m13
+    m21 = m17 ^ m15
+    m22 = m18 ^ m13
+    m23 = m19 ^ t25
+    m24 = m22 ^ m23
+    m25 = m22 & m20
+    m26 = m21 ^ m25
+    m27 = m20 ^ m21
+    m28 = m23 ^ m25
+    m29 = m28 & m27
+    m30 = m26 & m24
+    m31 = m20 & m23
+    m32 = m27 & m31
+    m33 = m27 ^ m25
+    m34 = m21 & m22
+    m35 = m24 & m34
+    m36 = m24 ^ m25
+    m37 = m21 ^ m29
+    m38 = m32 ^ m33
+    m39 = m23 ^ m30
+    m40 = m35 ^ m36
+    m41 = m38 ^ m40
+    m42 = m37 ^ m39
+    m43 = m37 ^ m38
+    m44 = m39 ^ m40
+    m45 = m42 ^ m41
+    m46 = m44 & t6
+    m47 = m40 & t8
+    m48 = m39 & u7
+    m49 = m43 & t16
+    m50 = m38 & t9
+    m51 = m37 & t17
+    m52 = m42 & t15
+    m53 = m45 & t27
+    m54 = m41 & t10
+    m55 = m44 & t13
+    m56 = m40 & t23
+    m57 = m39 & t19
+    m58 = m43 & t3
+    m59 = m38 & t22
+    m60 = m37 & t20
+    m61 = m42 & t1
+    m62 = m45 & t4
+    m63 = m41 & t2
+    l0 = m61 ^ m62
+    l1 = m50 ^ m56
+    l2 = m46 ^ m48
+    l3 = m47 ^ m55
+    l4 = m54 ^ m58
+    l5 = m49 ^ m61
+    l6 = m62 ^ l5
+    l7 = m46 ^ l3
+    l8 = m51 ^ m59
+    l9 = m52 ^ m53
+    l10 = m53 ^ l4
+    l11 = m60 ^ l2
+    l12 = m48 ^ m51
+    l13 = m50 ^ l0
+    l14 = m52 ^ m61
+    l15 = m55 ^ l1
+    l16 = m56 ^ l0
+    l17 = m57 ^ l1
+    l18 = m58 ^ l8
+    l19 = m63 ^ l4
+    l20 = l0 ^ l1
+    l21 = l1 ^ l7
+    l22 = l3 ^ l12
+    l23 = l18 ^ l2
+    l24 = l15 ^ l9
+    l25 = l6 ^ l10
+    l26 = l7 ^ l9
+    l27 = l8 ^ l10
+    l28 = l11 ^ l14
+    l29 = l11 ^ l17
+    return (l6 ^ l24, ~(l16 ^ l26), ~(l19 ^ l28), l6 ^ l21,
+            l20 ^ l22, l25 ^ l29, ~(l13 ^ l27), ~(l6 ^ l23))
+
+
+def _bs_inv_affine(u):
+    """Inverse of the S-box affine map over bit planes (most significant bit first)."""
+    u0, u1, u2, u3, u4, u5, u6, u7 = u
+    # b'_i = b_(i+2) ^ b_(i+5) ^ b_(i+7) ^ 0x05_i, with i counted from the LSB
+    return (u1 ^ u3 ^ u6, u2 ^ u4 ^ u7, u0 ^ u3 ^ u5, u1 ^ u4 ^ u6,
+            u2 ^ u5 ^ u7, ~(u0 ^ u3 ^ u6), u1 ^ u4 ^ u7, ~(u0 ^ u2 ^ u5))
+
+
+def _bs_sub_bytes(state):
+    """SubBytes over an (8, 16, G) uint64 bitsliced state."""
+    return np.stack(_bs_sbox(state))
+
+
+def _bs_inv_sub_bytes(state):
+    """
+    InvSubBytes over an (8, 16, G) uint64 bitsliced state.
+    
+    S(z) = A(z^-1) for the affine map A, so z^-1 = A^-1(S(z)) and
+    InvSubBytes(y) = A^-1(S(A^-1(y))), reusing the forward circuit.
+    """
+    return np.stack(_bs_inv_affine(_bs_sbox(_bs_inv_affine(state))))
+
+
+def _bs_xtime(state):
+    """Multiply every byte of a bitsliced state by x in GF(2^8)."""
+    # Shifting left moves each plane up by one; the old top bit is reduced by 0x1B
+    hi = state[0]
+    out = np.roll(state, -1, axis=0)
+    out[3] ^= hi
+    out[4] ^= hi
+    out[6] ^= hi
+    return out
+
+
+def _bs_mix_columns(state):
+    """MixColumns over an (8, 16, G) bitsliced state."""
+    # Byte i of a block is row i % 4 of column i // 4, as in _np_mix_columns
+    cols = state.reshape(8, 4, 4, -1)
+    total = cols[:, :, 0] ^ cols[:, :, 1] ^ cols[:, :, 2] ^ cols[:, :, 3]
+    mixed = cols ^ total[:, :, None] ^ _bs_xtime(cols ^ cols[:, :, [1, 2, 3, 0]])
+    return mixed.reshape(state.shape)
+
+
+def _bs_inv_mix_columns(state):
+    """InvMixColumns over an (8, 16, G) bitsliced state."""
+    cols = state.reshape(8, 4, 4, -1)
+    cols = cols ^ _bs_xtime(_bs_xtime(cols ^ cols[:, :, [2, 3, 0, 1]]))
+    return _bs_mix_columns(cols.reshape(state.shape))
+
+
+def _bs_transpose64(words):
+    """
+    Transpose 64x64 bit matrices in place.
+    
+    words is a (..., 64) uint64 array whose last axis holds the rows of
+    each matrix, most significant bit in column 0. Six butterfly stages
+    swap ever smaller off-diagonal blocks (Hacker's Delight, 7-3), each
+    one a few whole-array operations.
+    """
+    j = 32
+    mask = np.uint64(0x00000000FFFFFFFF)
+    while j:
+        rows = words.reshape(words.shape[:-1] + (64 // (2 * j), 2, j))
+        lo = rows[..., 0, :]
+        hi = rows[..., 1, :]
+        shift = np.uint64(j)
+        t = (lo ^ (hi >> shift)) & mask
+        lo ^= t
+        hi ^= t << shift
+        j //= 2
+        mask ^= mask << np.uint64(j)
+
+
+def _bs_pack(blocks):
+    """
+    Transpose (N, 16) uint8 blocks into an (8, 16, G) uint64 bitsliced state.
+    
+    Blocks are taken in groups of 64 (the last group zero-padded) and each
+    group's two 64x64 bit matrices of little-endian words are transposed,
+    so that state[b, i, g] holds bit b (most significant first) of byte i
+    of all 64 blocks of group g.
+    """
+    groups = -(-len(blocks) // 64)
+    padded = np.zeros((groups * 64, 16), dtype=np.uint8)
+    padded[:len(blocks)] = blocks
+    words = padded.view('<u8').reshape(groups, 64, 2).transpose(0, 2, 1).astype(np.uint64)
+    _bs_transpose64(words)
+    # Row 8 * k + b of word w is bit b of byte 8 * w + 7 - k
+    return words.reshape(groups, 2, 8, 8)[:, :, ::-1].transpose(3, 1, 2, 0).reshape(8, 16, groups)
+
+
+def _bs_unpack(state, num_blocks):
+    """Transpose an (8, 16, G) bitsliced state back into (num_blocks, 16) uint8 blocks."""
+    groups = state.shape[2]
+    words = state.reshape(8, 2, 8, groups).transpose(3, 1, 2, 0)[:, :, ::-1].reshape(groups, 2, 64)
+    _bs_transpose64(words)
+    blocks = np.ascontiguousarray(words.transpose(0, 2, 1), dtype='<u8').view(np.uint8)
+    return blocks.reshape(-1, 16)[:num_blocks]
+
+class KeySchedule:
+    """
+    Compact expanded AES key.
+    
+    Each round key is computed once and stored as a single 128-bit int that
+    packs its 16 bytes in block order, for encryption (enc) and for the
+    equivalent inverse cipher used by decryption (dec). An AES-128 schedule
+    takes about 1.5 KB, so tens of thousands of session keys can stay cached.
+    """
+    __slots__ = ("rounds", "enc", "dec", "np_enc", "bs_enc", "ghash")
+
+    def __init__(self, rounds, enc, dec):
+        """
+        Args:
+            rounds (int): Number of AES rounds
+            enc (tuple): rounds + 1 packed encryption round keys
+            dec (tuple): rounds + 1 packed decryption round keys
+        """
+        self.rounds = rounds
+        self.enc = enc
+        self.dec = dec
+        # (rounds + 1, 16) uint8 encryption round keys for the batched core, built on first use
+        self.np_enc = None
+        # (rounds + 1, 8, 16, 1) uint64 round key masks for the bitsliced core, built on first use
+        self.bs_enc = None
+        # 8-bit Shoup multiplication table for GCM's GHASH, built on first use
+        self.ghash = None
+
+
+class KeyScheduleCache:
+    """
+    Bounded LRU cache of expanded AES key schedules.
+    
+    One instance (key_schedule_cache) is shared by every AES object in the
+    process, so constructing AES, AES_CBC, AES_CTR or the parallel and CUDA
+    wrappers again with a recently used key skips the key expansion.
+    """
+    def __init__(self, maxsize=1024):
+        """
+        Args:
+            maxsize (int): Maximum number of schedules kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Plain dicts keep insertion order, oldest entry first
+        self._entries = {}
+        # _thread rather than threading, which costs several ms to import
+        self._lock = _thread.allocate_lock()
+
+    def get(self, key, key_size, expand):
+        """
+        Return the schedule for (key, key_size), expanding it on a miss.
+        
+        Args:
+            key (bytes): The encryption/decryption key
+            key_size (int): Key size in bits
+            expand (callable): Called with the key to build the schedule
+        
+        Returns:
+            The cached schedule, as returned by expand
+        """
+        cache_key = (bytes(key), key_size)
+        with self._lock:
+            schedule = self._entries.pop(cache_key, None)
+            if schedule is not None:
+                self._entries[cache_key] = schedule
+                self.hits += 1
+                return schedule
+            self.misses += 1
+        
+        schedule = expand(key)
+        
+        with self._lock:
+            self._entries.pop(cache_key, None)
+            self._entries[cache_key] = schedule
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
+        return schedule
+
+    def invalidate(self, key=None, key_size=None):
+        """
+        Drop cached schedules.
+        
+        Args:
+            key (bytes): Key to drop, or None to clear the whole cache
+            key_size (int): Key size to drop, or None for every size of key
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                return
+            key = bytes(key)
+            for size in ([key_size] if key_size is not None else [128, 192, 256]):
+                self._entries.pop((key, size), None)
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, current size and maxsize of the cache
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+
+# Process-wide key schedule cache used by AES
+key_schedule_cache = KeyScheduleCache()
 
 
 class AES:
     
+    # Available block engines: "ttable" packs the state into four 32-bit
+    # column words and does one table lookup per byte per round, while
+    # "reference" is the byte-matrix implementation that follows FIPS-197
+    # step by step.
+    engines = ("ttable", "reference")
+    default_engine = "ttable"
+    
+    # Available cores for the batched encrypt_blocks/decrypt_blocks: "lookup"
+    # indexes NumPy S-box arrays with the state bytes, while "bitsliced"
+    # transposes 64 blocks at a time into bit planes and evaluates SubBytes
+    # as a Boolean circuit, with no memory access that depends on the data.
+    block_cores = ("lookup", "bitsliced")
+    default_block_core = "lookup"
+    # Blocks transposed into bit planes per pass of the bitsliced core
+    bitslice_chunk = 1 << 13
+    
     # S-box and Inverse S-box (S is for Substitution)
     sbox = [
         0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
@@ -49,16 +505,34 @@ class AES:
         0xD4, 0xB3, 0x7D, 0xFA, 0xEF, 0xC5, 0x91, 0x39
     ]
 
-    def __init__(self, key, key_size=128):
+    # T-tables combining SubBytes, ShiftRows and (Inv)MixColumns per byte
+    Te0, Te1, Te2, Te3, Td0, Td1, Td2, Td3 = _build_t_tables(sbox, inv_sbox)
+
+    def __init__(self, key, key_size=128, engine=None, block_core=None):
         """
         Initialize AES with the given key and key size.
         
         Args:
             key (bytes): The encryption/decryption key
             key_size (int): Key size in bits, can be 128, 192, or 256
+            engine (str): Block engine, "ttable" or "reference"
+                (defaults to AES.default_engine)
+            block_core (str): Batched core, "lookup" or "bitsliced"
+                (defaults to AES.default_block_core)
         """
+        if engine is None:
+            engine = self.default_engine
+        if engine not in self.engines:
+            raise ValueError(f"Engine must be one of {', '.join(self.engines)}")
+        if block_core is None:
+            block_core = self.default_block_core
+        if block_core not in self.block_cores:
+            raise ValueError(f"Block core must be one of {', '.join(self.block_cores)}")
+        
         self.key = key
         self.key_size = key_size
+        self.engine = engine
+        self.block_core = block_core
         
         # AES parameters based on key size
         if key_size == 128:
@@ -77,8 +551,21 @@ class AES:
         if len(key) * 8 != key_size:
             raise ValueError(f"Key length should be {key_size // 8} bytes")
         
-        # Generate round keys
-        self.round_keys = self._key_expansion(key)
+        # Generate round keys; the schedule is shared through the process-wide
+        # cache, so repeating a key skips the expansion
+        self.schedule = key_schedule_cache.get(key, key_size, self._expand_schedule)
+
+    @property
+    def round_keys(self):
+        """
+        Round keys in the original layout: four 4-byte rows per round, where
+        row r holds byte r of each of the round key's four column words.
+        """
+        rows = []
+        for round_key in self.schedule.enc:
+            b = round_key.to_bytes(16, 'big')
+            rows.extend([b[r], b[4 + r], b[8 + r], b[12 + r]] for r in range(4))
+        return rows
 
     def encrypt(self, plaintext):
         """
@@ -93,24 +580,29 @@ class AES:
         if len(plaintext) != 16:
             raise ValueError("Plaintext block must be 16 bytes")
         
+        if self.engine == "ttable":
+            return _BLOCK.pack(*self._encrypt_ttable(*_BLOCK.unpack(plaintext)))
+        
         # Convert plaintext to state matrix (4x4 array of bytes)
         state = [list(plaintext[i:i+4]) for i in range(0, 16, 4)]
         state = [list(row) for row in zip(*state)]  # Transpose
         
+        round_keys = self.schedule.enc
+        
         # Initial round key addition
-        state = self._add_round_key(state, self.round_keys[:4])
+        state = self._add_round_key(state, round_keys[0])
         
         # Main rounds
         for round_num in range(1, self.rounds):
             state = self._sub_bytes(state)
             state = self._shift_rows(state)
             state = self._mix_columns(state)
-            state = self._add_round_key(state, self.round_keys[4*round_num:4*(round_num+1)])
+            state = self._add_round_key(state, round_keys[round_num])
         
         # Final round (no mix columns)
         state = self._sub_bytes(state)
         state = self._shift_rows(state)
-        state = self._add_round_key(state, self.round_keys[4*self.rounds:4*(self.rounds+1)])
+        state = self._add_round_key(state, round_keys[self.rounds])
         
         # Convert state matrix back to bytes
         state = [list(row) for row in zip(*state)]  # Transpose back
@@ -129,29 +621,273 @@ class AES:
         if len(ciphertext) != 16:
             raise ValueError("Ciphertext block must be 16 bytes")
         
+        if self.engine == "ttable":
+            return _BLOCK.pack(*self._decrypt_ttable(*_BLOCK.unpack(ciphertext)))
+        
         # Convert ciphertext to state matrix (4x4 array of bytes)
         state = [list(ciphertext[i:i+4]) for i in range(0, 16, 4)]
         state = [list(row) for row in zip(*state)]  # Transpose
         
+        round_keys = self.schedule.enc
+        
         # Initial round key addition
-        state = self._add_round_key(state, self.round_keys[4*self.rounds:4*(self.rounds+1)])
+        state = self._add_round_key(state, round_keys[self.rounds])
         
         # Main rounds
         for round_num in range(self.rounds-1, 0, -1):
             state = self._inv_shift_rows(state)
             state = self._inv_sub_bytes(state)
-            state = self._add_round_key(state, self.round_keys[4*round_num:4*(round_num+1)])
+            state = self._add_round_key(state, round_keys[round_num])
             state = self._inv_mix_columns(state)
         
         # Final round (no mix columns)
         state = self._inv_shift_rows(state)
         state = self._inv_sub_bytes(state)
-        state = self._add_round_key(state, self.round_keys[:4])
+        state = self._add_round_key(state, round_keys[0])
         
         # Convert state matrix back to bytes
         state = [list(row) for row in zip(*state)]  # Transpose back
         return bytes(sum(state, []))
 
+    def encrypt_block_into(self, src, src_off, dst, dst_off):
+        """
+        Encrypt the 16-byte block at src[src_off:] into dst[dst_off:].
+        
+        With the T-table engine the block is read and written in place
+        through the buffer protocol, without allocating intermediate bytes.
+        src and dst may be the same buffer.
+        
+        Args:
+            src: Readable buffer (bytes, bytearray, memoryview, mmap, ...)
+            src_off (int): Offset of the plaintext block in src
+            dst: Writable buffer (bytearray, memoryview, mmap, ...)
+            dst_off (int): Offset of the ciphertext block in dst
+        """
+        _BLOCK.pack_into(dst, dst_off, *self._encrypt_words(*_BLOCK.unpack_from(src, src_off)))
+
+    def decrypt_block_into(self, src, src_off, dst, dst_off):
+        """
+        Decrypt the 16-byte block at src[src_off:] into dst[dst_off:].
+        
+        Args:
+            src: Readable buffer (bytes, bytearray, memoryview, mmap, ...)
+            src_off (int): Offset of the ciphertext block in src
+            dst: Writable buffer (bytearray, memoryview, mmap, ...)
+            dst_off (int): Offset of the plaintext block in dst
+        """
+        _BLOCK.pack_into(dst, dst_off, *self._decrypt_words(*_BLOCK.unpack_from(src, src_off)))
+
+    def _words_function(self, encrypt):
+        """Return the word-level block function for this engine, for use in hot loops."""
+        if self.engine == "ttable":
+            return self._encrypt_ttable if encrypt else self._decrypt_ttable
+        return self._encrypt_words if encrypt else self._decrypt_words
+
+    def _encrypt_words(self, s0, s1, s2, s3):
+        """Encrypt one block given and returned as four big-endian column words."""
+        if self.engine == "ttable":
+            return self._encrypt_ttable(s0, s1, s2, s3)
+        return _BLOCK.unpack(self.encrypt(_BLOCK.pack(s0, s1, s2, s3)))
+
+    def _decrypt_words(self, s0, s1, s2, s3):
+        """Decrypt one block given and returned as four big-endian column words."""
+        if self.engine == "ttable":
+            return self._decrypt_ttable(s0, s1, s2, s3)
+        return _BLOCK.unpack(self.decrypt(_BLOCK.pack(s0, s1, s2, s3)))
+
+    def encrypt_blocks(self, blocks):
+        """
+        Encrypt many independent 16-byte blocks at once (ECB) using NumPy.
+        
+        All blocks go through every round together, so the Python overhead
+        is paid per round rather than per byte.
+        
+        Args:
+            blocks (numpy.ndarray): (N, 16) uint8 array of plaintext blocks
+        
+        Returns:
+            numpy.ndarray: (N, 16) uint8 array of ciphertext blocks
+        """
+        state = self._check_blocks(blocks)
+        if self.block_core == "bitsliced":
+            return self._crypt_bitsliced(state, encrypt=True)
+        round_keys = self._get_np_round_keys()
+        sbox, _, shift_rows, _ = _np_tables()
+        
+        state = state ^ round_keys[0]
+        
+        for round_num in range(1, self.rounds):
+            state = _np_mix_columns(sbox[state[:, shift_rows]])
+            state ^= round_keys[round_num]
+        
+        # Final round (no mix columns)
+        state = sbox[state[:, shift_rows]]
+        state ^= round_keys[self.rounds]
+        return state
+
+    def decrypt_blocks(self, blocks):
+        """
+        Decrypt many independent 16-byte blocks at once (ECB) using NumPy.
+        
+        Args:
+            blocks (numpy.ndarray): (N, 16) uint8 array of ciphertext blocks
+        
+        Returns:
+            numpy.ndarray: (N, 16) uint8 array of plaintext blocks
+        """
+        state = self._check_blocks(blocks)
+        if self.block_core == "bitsliced":
+            return self._crypt_bitsliced(state, encrypt=False)
+        round_keys = self._get_np_round_keys()
+        _, inv_sbox, _, inv_shift_rows = _np_tables()
+        
+        state = state ^ round_keys[self.rounds]
+        
+        for round_num in range(self.rounds - 1, 0, -1):
+            state = inv_sbox[state[:, inv_shift_rows]]
+            state ^= round_keys[round_num]
+            state = _np_inv_mix_columns(state)
+        
+        # Final round (no inverse mix columns)
+        state = inv_sbox[state[:, inv_shift_rows]]
+        state ^= round_keys[0]
+        return state
+
+    def _check_blocks(self, blocks):
+        """Validate input for the batched core and return it as an (N, 16) uint8 array."""
+        if np is None:
+            raise RuntimeError("NumPy is required for batched block operations")
+        blocks = np.asarray(blocks)
+        if blocks.dtype != np.uint8 or blocks.ndim != 2 or blocks.shape[1] != 16:
+            raise ValueError("Blocks must be an (N, 16) uint8 array")
+        return blocks
+
+    def _get_np_round_keys(self):
+        """Return the round keys as a (rounds + 1, 16) uint8 array."""
+        schedule = self.schedule
+        if schedule.np_enc is None:
+            flat = b"".join(round_key.to_bytes(16, 'big') for round_key in schedule.enc)
+            schedule.np_enc = np.frombuffer(flat, dtype=np.uint8).reshape(self.rounds + 1, 16)
+        return schedule.np_enc
+
+    def _get_bs_round_keys(self):
+        """Return the round keys as (rounds + 1, 8, 16, 1) uint64 all-ones/all-zeros plane masks."""
+        schedule = self.schedule
+        if schedule.bs_enc is None:
+            bits = np.unpackbits(self._get_np_round_keys()[:, :, None], axis=2)
+            masks = np.where(bits.transpose(0, 2, 1), ~np.uint64(0), np.uint64(0))
+            schedule.bs_enc = masks.reshape(self.rounds + 1, 8, 16, 1)
+        return schedule.bs_enc
+
+    def _crypt_bitsliced(self, blocks, encrypt):
+        """
+        Encrypt or decrypt (N, 16) uint8 blocks with the bitsliced core.
+        
+        Round keys are XORed in as whole-plane masks, SubBytes is the
+        Boolean circuit of _bs_sbox, ShiftRows a permutation of the 16 byte
+        planes and MixColumns plane XORs, so no step indexes memory with
+        key or data bits. Blocks are transposed bitslice_chunk at a time to
+        bound the size of the intermediate bit arrays.
+        """
+        round_keys = self._get_bs_round_keys()
+        _, _, shift_rows, inv_shift_rows = _np_tables()
+        out = np.empty_like(blocks)
+        
+        for start in range(0, len(blocks), self.bitslice_chunk):
+            chunk = blocks[start:start + self.bitslice_chunk]
+            state = _bs_pack(chunk)
+            if encrypt:
+                state ^= round_keys[0]
+                for round_num in range(1, self.rounds):
+                    state = _bs_mix_columns(_bs_sub_bytes(state[:, shift_rows]))
+                    state ^= round_keys[round_num]
+                state = _bs_sub_bytes(state[:, shift_rows])
+                state ^= round_keys[self.rounds]
+            else:
+                state ^= round_keys[self.rounds]
+                for round_num in range(self.rounds - 1, 0, -1):
+                    state = _bs_inv_sub_bytes(state[:, inv_shift_rows])
+                    state ^= round_keys[round_num]
+                    state = _bs_inv_mix_columns(state)
+                state = _bs_inv_sub_bytes(state[:, inv_shift_rows])
+                state ^= round_keys[0]
+            out[start:start + len(chunk)] = _bs_unpack(state, len(chunk))
+        return out
+
+    def _encrypt_ttable(self, s0, s1, s2, s3):
+        """Encrypt one block of four column words with the T-table engine."""
+        Te0, Te1, Te2, Te3 = self.Te0, self.Te1, self.Te2, self.Te3
+        sbox = self.sbox
+        ek = self.schedule.enc
+        
+        k = ek[0]
+        s0 ^= k >> 96
+        s1 ^= (k >> 64) & 0xFFFFFFFF
+        s2 ^= (k >> 32) & 0xFFFFFFFF
+        s3 ^= k & 0xFFFFFFFF
+        
+        # Each output column takes row r from input column (c + r) mod 4 (ShiftRows)
+        for round_num in range(1, self.rounds):
+            k = ek[round_num]
+            t0 = Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xFF] ^ Te2[(s2 >> 8) & 0xFF] ^ Te3[s3 & 0xFF] ^ (k >> 96)
+            t1 = Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xFF] ^ Te2[(s3 >> 8) & 0xFF] ^ Te3[s0 & 0xFF] ^ ((k >> 64) & 0xFFFFFFFF)
+            t2 = Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xFF] ^ Te2[(s0 >> 8) & 0xFF] ^ Te3[s1 & 0xFF] ^ ((k >> 32) & 0xFFFFFFFF)
+            t3 = Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xFF] ^ Te2[(s1 >> 8) & 0xFF] ^ Te3[s2 & 0xFF] ^ (k & 0xFFFFFFFF)
+            s0, s1, s2, s3 = t0, t1, t2, t3
+        
+        # Final round (no mix columns)
+        k = ek[self.rounds]
+        t0 = ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 0xFF] << 16) |
+              (sbox[(s2 >> 8) & 0xFF] << 8) | sbox[s3 & 0xFF]) ^ (k >> 96)
+        t1 = ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 0xFF] << 16) |
+              (sbox[(s3 >> 8) & 0xFF] << 8) | sbox[s0 & 0xFF]) ^ ((k >> 64) & 0xFFFFFFFF)
+        t2 = ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 0xFF] << 16) |
+              (sbox[(s0 >> 8) & 0xFF] << 8) | sbox[s1 & 0xFF]) ^ ((k >> 32) & 0xFFFFFFFF)
+        t3 = ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 0xFF] << 16) |
+              (sbox[(s1 >> 8) & 0xFF] << 8) | sbox[s2 & 0xFF]) ^ (k & 0xFFFFFFFF)
+        
+        return t0, t1, t2, t3
+
+    def _decrypt_ttable(self, s0, s1, s2, s3):
+        """
+        Decrypt one block of four column words with the T-table engine.
+        
+        Uses the equivalent inverse cipher (FIPS-197 section 5.3.5): with
+        InvMixColumns already applied to the middle round keys, every round
+        is one Td lookup per byte plus a key XOR, just like encryption.
+        """
+        Td0, Td1, Td2, Td3 = self.Td0, self.Td1, self.Td2, self.Td3
+        inv_sbox = self.inv_sbox
+        dk = self.schedule.dec
+        
+        k = dk[0]
+        s0 ^= k >> 96
+        s1 ^= (k >> 64) & 0xFFFFFFFF
+        s2 ^= (k >> 32) & 0xFFFFFFFF
+        s3 ^= k & 0xFFFFFFFF
+        
+        # Each output column takes row r from input column (c - r) mod 4 (InvShiftRows)
+        for round_num in range(1, self.rounds):
+            k = dk[round_num]
+            t0 = Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xFF] ^ Td2[(s2 >> 8) & 0xFF] ^ Td3[s1 & 0xFF] ^ (k >> 96)
+            t1 = Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xFF] ^ Td2[(s3 >> 8) & 0xFF] ^ Td3[s2 & 0xFF] ^ ((k >> 64) & 0xFFFFFFFF)
+            t2 = Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xFF] ^ Td2[(s0 >> 8) & 0xFF] ^ Td3[s3 & 0xFF] ^ ((k >> 32) & 0xFFFFFFFF)
+            t3 = Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xFF] ^ Td2[(s1 >> 8) & 0xFF] ^ Td3[s0 & 0xFF] ^ (k & 0xFFFFFFFF)
+            s0, s1, s2, s3 = t0, t1, t2, t3
+        
+        # Final round (no inverse mix columns)
+        k = dk[self.rounds]
+        t0 = ((inv_sbox[s0 >> 24] << 24) | (inv_sbox[(s3 >> 16) & 0xFF] << 16) |
+              (inv_sbox[(s2 >> 8) & 0xFF] << 8) | inv_sbox[s1 & 0xFF]) ^ (k >> 96)
+        t1 = ((inv_sbox[s1 >> 24] << 24) | (inv_sbox[(s0 >> 16) & 0xFF] << 16) |
+              (inv_sbox[(s3 >> 8) & 0xFF] << 8) | inv_sbox[s2 & 0xFF]) ^ ((k >> 64) & 0xFFFFFFFF)
+        t2 = ((inv_sbox[s2 >> 24] << 24) | (inv_sbox[(s1 >> 16) & 0xFF] << 16) |
+              (inv_sbox[(s0 >> 8) & 0xFF] << 8) | inv_sbox[s3 & 0xFF]) ^ ((k >> 32) & 0xFFFFFFFF)
+        t3 = ((inv_sbox[s3 >> 24] << 24) | (inv_sbox[(s2 >> 16) & 0xFF] << 16) |
+              (inv_sbox[(s1 >> 8) & 0xFF] << 8) | inv_sbox[s0 & 0xFF]) ^ (k & 0xFFFFFFFF)
+        
+        return t0, t1, t2, t3
+
     def _sub_bytes(self, state):
         """Apply S-box substitution to each byte of the state."""
         return [[self.sbox[byte] for byte in row] for row in state]
@@ -179,7 +915,7 @@ class AES:
         ]
 
     def _mix_columns(self, state):
-        """Mix columns using Galois Field multiplication."""
+        """Mix each column of the state using Galois Field multiplication."""
         def galois_mult(a, b):
             p = 0
             for _ in range(8):
@@ -192,34 +928,14 @@ class AES:
                 b >>= 1
             return p & 0xFF
 
-        new_state = [[] for _ in range(4)]
+        new_state = [[0] * 4 for _ in range(4)]
         
-        for i in range(4):
-            for j in range(4):
-                new_state[i].append(
-                    galois_mult(0x02, state[i][0]) ^
-                    galois_mult(0x03, state[i][1]) ^
-                    state[i][2] ^
-                    state[i][3]
-                )
-                new_state[i].append(
-                    state[i][0] ^
-                    galois_mult(0x02, state[i][1]) ^
-                    galois_mult(0x03, state[i][2]) ^
-                    state[i][3]
-                )
-                new_state[i].append(
-                    state[i][0] ^
-                    state[i][1] ^
-                    galois_mult(0x02, state[i][2]) ^
-                    galois_mult(0x03, state[i][3])
-                )
-                new_state[i].append(
-                    galois_mult(0x03, state[i][0]) ^
-                    state[i][1] ^
-                    state[i][2] ^
-                    galois_mult(0x02, state[i][3])
-                )
+        for c in range(4):
+            a0, a1, a2, a3 = state[0][c], state[1][c], state[2][c], state[3][c]
+            new_state[0][c] = galois_mult(0x02, a0) ^ galois_mult(0x03, a1) ^ a2 ^ a3
+            new_state[1][c] = a0 ^ galois_mult(0x02, a1) ^ galois_mult(0x03, a2) ^ a3
+            new_state[2][c] = a0 ^ a1 ^ galois_mult(0x02, a2) ^ galois_mult(0x03, a3)
+            new_state[3][c] = galois_mult(0x03, a0) ^ a1 ^ a2 ^ galois_mult(0x02, a3)
         
         return new_state
 
@@ -237,97 +953,107 @@ class AES:
                 b >>= 1
             return p & 0xFF
 
-        new_state = [[] for _ in range(4)]
+        new_state = [[0] * 4 for _ in range(4)]
         
-        for i in range(4):
-            for j in range(4):
-                new_state[i].append(
-                    galois_mult(0x0E, state[i][0]) ^
-                    galois_mult(0x0B, state[i][1]) ^
-                    galois_mult(0x0D, state[i][2]) ^
-                    galois_mult(0x09, state[i][3])
-                )
-                new_state[i].append(
-                    galois_mult(0x09, state[i][0]) ^
-                    galois_mult(0x0E, state[i][1]) ^
-                    galois_mult(0x0B, state[i][2]) ^
-                    galois_mult(0x0D, state[i][3])
-                )
-                new_state[i].append(
-                    galois_mult(0x0D, state[i][0]) ^
-                    galois_mult(0x09, state[i][1]) ^
-                    galois_mult(0x0E, state[i][2]) ^
-                    galois_mult(0x0B, state[i][3])
-                )
-                new_state[i].append(
-                    galois_mult(0x0B, state[i][0]) ^
-                    galois_mult(0x0D, state[i][1]) ^
-                    galois_mult(0x09, state[i][2]) ^
-                    galois_mult(0x0E, state[i][3])
-                )
+        for c in range(4):
+            a0, a1, a2, a3 = state[0][c], state[1][c], state[2][c], state[3][c]
+            new_state[0][c] = (galois_mult(0x0E, a0) ^ galois_mult(0x0B, a1) ^
+                               galois_mult(0x0D, a2) ^ galois_mult(0x09, a3))
+            new_state[1][c] = (galois_mult(0x09, a0) ^ galois_mult(0x0E, a1) ^
+                               galois_mult(0x0B, a2) ^ galois_mult(0x0D, a3))
+            new_state[2][c] = (galois_mult(0x0D, a0) ^ galois_mult(0x09, a1) ^
+                               galois_mult(0x0E, a2) ^ galois_mult(0x0B, a3))
+            new_state[3][c] = (galois_mult(0x0B, a0) ^ galois_mult(0x0D, a1) ^
+                               galois_mult(0x09, a2) ^ galois_mult(0x0E, a3))
         
         return new_state
 
     def _add_round_key(self, state, round_key):
-        """XOR state with round key."""
+        """XOR state with a packed 128-bit round key."""
+        key_bytes = round_key.to_bytes(16, 'big')
         new_state = []
         for i in range(4):
             row = []
             for j in range(4):
-                row.append(state[i][j] ^ round_key[j][i])
+                row.append(state[i][j] ^ key_bytes[4*j + i])
             new_state.append(row)
         return new_state
 
     def _key_expansion(self, key):
         """
-        Expand the key into round keys.
+        Expand the key into round key words (FIPS-197 section 5.2).
         
         Args:
             key (bytes): The encryption/decryption key
         
         Returns:
-            list: Round keys as a list of 4x4 word matrices
+            list: 4 * (rounds + 1) big-endian 32-bit words
         """
+        sbox = self.sbox
+        
+        def sub_word(w):
+            return ((sbox[w >> 24] << 24) | (sbox[(w >> 16) & 0xFF] << 16) |
+                    (sbox[(w >> 8) & 0xFF] << 8) | sbox[w & 0xFF])
+        
         # Convert key to a list of words (4 bytes each)
-        key_words = []
-        for i in range(0, len(key), 4):
-            word = [key[i], key[i+1], key[i+2], key[i+3]]
-            key_words.append(word)
+        words = [int.from_bytes(key[i:i+4], 'big') for i in range(0, len(key), 4)]
         
         # Expand key to get round keys
         for i in range(self.key_words, 4 * (self.rounds + 1)):
-            temp = key_words[i-1].copy()
+            temp = words[i-1]
             
             if i % self.key_words == 0:
-                # Rotate word
-                temp = temp[1:] + temp[:1]
-                # SubBytes
-                temp = [self.sbox[b] for b in temp]
-                # XOR with Rcon
-                temp[0] ^= self.rcon[i // self.key_words]
+                # Rotate word, SubBytes and XOR with Rcon
+                temp = sub_word(((temp << 8) | (temp >> 24)) & 0xFFFFFFFF)
+                temp ^= self.rcon[i // self.key_words] << 24
             elif self.key_words > 6 and i % self.key_words == 4:
                 # Additional SubBytes for 256-bit keys
-                temp = [self.sbox[b] for b in temp]
+                temp = sub_word(temp)
             
             # XOR with word self.key_words positions earlier
-            word = []
-            for j in range(4):
-                word.append(key_words[i-self.key_words][j] ^ temp[j])
-            
-            key_words.append(word)
+            words.append(words[i-self.key_words] ^ temp)
         
-        # Convert to 4x4 matrices for each round
-        round_keys = []
-        for i in range(0, len(key_words), 4):
-            round_key = [[] for _ in range(4)]
-            for j in range(4):
-                if i+j < len(key_words):
-                    for k in range(4):
-                        round_key[k].append(key_words[i+j][k])
-            if len(round_key[0]) == 4:  # Only add complete round keys
-                round_keys.extend(round_key)
+        return words
+
+    def _expand_schedule(self, key):
+        """Build the KeySchedule stored in the key schedule cache."""
+        words = self._key_expansion(key)
+        enc = tuple(
+            (words[i] << 96) | (words[i+1] << 64) | (words[i+2] << 32) | words[i+3]
+            for i in range(0, len(words), 4)
+        )
+        return KeySchedule(self.rounds, enc, self._inverse_round_keys(enc))
+
+    def _inverse_round_keys(self, enc):
+        """
+        Build the decryption key schedule for the equivalent inverse cipher.
+        
+        Round keys are used in reverse order, and InvMixColumns is applied to
+        every round key except the first and last so that it commutes with
+        the Td table lookups.
         
-        return round_keys
+        Args:
+            enc (tuple): Packed encryption round keys
+        
+        Returns:
+            tuple: Packed decryption round keys
+        """
+        Td0, Td1, Td2, Td3 = self.Td0, self.Td1, self.Td2, self.Td3
+        sbox = self.sbox
+        
+        def inv_mix_column(w):
+            # The Td tables fold in InvSubBytes, so feed them sbox[b]
+            return (Td0[sbox[w >> 24]] ^ Td1[sbox[(w >> 16) & 0xFF]] ^
+                    Td2[sbox[(w >> 8) & 0xFF]] ^ Td3[sbox[w & 0xFF]])
+        
+        dec = [enc[self.rounds]]
+        for round_num in range(self.rounds - 1, 0, -1):
+            mixed = 0
+            for shift in (96, 64, 32, 0):
+                mixed |= inv_mix_column((enc[round_num] >> shift) & 0xFFFFFFFF) << shift
+            dec.append(mixed)
+        dec.append(enc[0])
+        return tuple(dec)
 
 
 # Utility functions for padding and mode of operation support
@@ -358,7 +1084,7 @@ def unpad_pkcs7(data):
         bytes: Data with padding removed
     """
     padding_length = data[-1]
-    if padding_length > len(data):
+    if padding_length == 0 or padding_length > len(data):
         raise ValueError("Invalid padding")
     for i in range(1, padding_length + 1):
         if data[-i] != padding_length:
@@ -369,7 +1095,11 @@ class AES_CBC:
     """
     AES in Cipher Block Chaining (CBC) mode.
     """
-    def __init__(self, key, iv, key_size=128):
+    # Inputs with at least this many blocks are decrypted with the batched
+    # NumPy core when it is available
+    batch_threshold = 32
+
+    def __init__(self, key, iv, key_size=128, block_core=None):
         """
         Initialize AES-CBC with key and initialization vector.
         
@@ -377,11 +1107,13 @@ class AES_CBC:
             key (bytes): Encryption/decryption key
             iv (bytes): 16-byte initialization vector
             key_size (int): Key size in bits, can be 128, 192, or 256
+            block_core (str): Batched core used for decryption, "lookup" or
+                "bitsliced" (defaults to AES.default_block_core)
         """
         if len(iv) != 16:
             raise ValueError("IV must be 16 bytes")
         
-        self.aes = AES(key, key_size)
+        self.aes = AES(key, key_size, block_core=block_core)
         self.iv = iv
 
     def encrypt(self, plaintext):
@@ -394,22 +1126,8 @@ class AES_CBC:
         Returns:
             bytes: Encrypted data
         """
-        plaintext = pad_pkcs7(plaintext)
-        blocks = [plaintext[i:i+16] for i in range(0, len(plaintext), 16)]
-        
-        ciphertext = bytearray()
-        prev_block = self.iv
-        
-        for block in blocks:
-            # XOR with previous ciphertext block (or IV for first block)
-            xored = bytes(x ^ y for x, y in zip(block, prev_block))
-            # Encrypt
-            encrypted_block = self.aes.encrypt(xored)
-            # Add to result
-            ciphertext.extend(encrypted_block)
-            # Update previous block
-            prev_block = encrypted_block
-        
+        ciphertext = bytearray(len(plaintext) - len(plaintext) % 16 + 16)
+        self.encrypt_into(plaintext, ciphertext)
         return bytes(ciphertext)
 
     def decrypt(self, ciphertext):
@@ -422,49 +1140,1228 @@ class AES_CBC:
         Returns:
             bytes: Decrypted data
         """
-        if len(ciphertext) % 16 != 0:
+        plaintext = bytearray(len(ciphertext))
+        length = self.decrypt_into(ciphertext, plaintext)
+        return bytes(memoryview(plaintext)[:length])
+
+    def encrypt_into(self, src, dst):
+        """
+        Encrypt and pad src, writing the ciphertext into a caller-provided buffer.
+        
+        Blocks are read from src and written to dst through memoryviews, so
+        a buffer can be reused across calls without any allocation per block.
+        src and dst may be the same buffer if it has room for the padding.
+        
+        Args:
+            src: Plaintext (bytes, bytearray, memoryview, mmap, ...)
+            dst: Writable buffer of at least len(src) rounded down to a
+                multiple of 16, plus 16 bytes
+        
+        Returns:
+            int: Number of ciphertext bytes written to dst
+        """
+        src = memoryview(src)
+        dst = memoryview(dst)
+        full = len(src) - len(src) % 16
+        total = full + 16
+        if len(dst) < total:
+            raise ValueError(f"Output buffer must hold at least {total} bytes")
+        
+        prev_words = self._encrypt_chain_into(src[:full], dst, _BLOCK.unpack(self.iv))
+        last_block = pad_pkcs7(bytes(src[full:]))
+        self._encrypt_chain_into(last_block, dst[full:total], prev_words)
+        return total
+
+    def decrypt_into(self, src, dst):
+        """
+        Decrypt src into a caller-provided buffer and check the padding.
+        
+        The padding bytes are written to dst as well; only the returned
+        length is meaningful plaintext. src and dst may be the same buffer.
+        
+        Args:
+            src: Ciphertext (bytes, bytearray, memoryview, mmap, ...)
+            dst: Writable buffer of at least len(src) bytes
+        
+        Returns:
+            int: Number of plaintext bytes at the start of dst
+        """
+        src = memoryview(src)
+        dst = memoryview(dst)
+        length = len(src)
+        if length % 16 != 0:
             raise ValueError("Ciphertext length must be a multiple of 16 bytes")
+        if length == 0:
+            raise ValueError("Ciphertext must not be empty")
+        if len(dst) < length:
+            raise ValueError(f"Output buffer must hold at least {length} bytes")
+        
+        self._decrypt_chain_into(src, dst[:length], _BLOCK.unpack(self.iv))
+        return length - 16 + len(unpad_pkcs7(bytes(dst[length - 16:length])))
+
+    def encryptor(self):
+        """
+        Start an incremental encryption with this key and IV.
+        
+        Returns:
+            CBCEncryptor: Object with update(chunk) and finalize() methods
+        """
+        return CBCEncryptor(self)
+
+    def decryptor(self):
+        """
+        Start an incremental decryption with this key and IV.
+        
+        Returns:
+            CBCDecryptor: Object with update(chunk) and finalize() methods
+        """
+        return CBCDecryptor(self)
+
+    def _encrypt_chain(self, data, prev_block):
+        """CBC-encrypt whole blocks of data, chaining from prev_block."""
+        ciphertext = bytearray(len(data))
+        self._encrypt_chain_into(data, ciphertext, _BLOCK.unpack(prev_block))
+        return bytes(ciphertext)
+
+    def _decrypt_chain(self, data, prev_block):
+        """CBC-decrypt whole blocks of data, chaining from prev_block. No unpadding."""
+        plaintext = bytearray(len(data))
+        self._decrypt_chain_into(data, plaintext, _BLOCK.unpack(prev_block))
+        return bytes(plaintext)
+
+    def _encrypt_chain_into(self, src, dst, prev_words):
+        """
+        CBC-encrypt whole blocks of src into dst.
+        
+        Args:
+            src: Readable buffer, a multiple of 16 bytes long
+            dst: Writable buffer at least as long as src
+            prev_words (tuple): Previous ciphertext block (or IV) as four words
+        
+        Returns:
+            tuple: The last ciphertext block as four words
+        """
+        encrypt_words = self.aes._words_function(encrypt=True)
+        unpack_from = _BLOCK.unpack_from
+        pack_into = _BLOCK.pack_into
+        p0, p1, p2, p3 = prev_words
+        
+        for offset in range(0, len(src), 16):
+            # XOR with previous ciphertext block (or IV for first block), then encrypt
+            s0, s1, s2, s3 = unpack_from(src, offset)
+            p0, p1, p2, p3 = encrypt_words(s0 ^ p0, s1 ^ p1, s2 ^ p2, s3 ^ p3)
+            pack_into(dst, offset, p0, p1, p2, p3)
         
-        blocks = [ciphertext[i:i+16] for i in range(0, len(ciphertext), 16)]
+        return p0, p1, p2, p3
+
+    def _decrypt_chain_into(self, src, dst, prev_words):
+        """
+        CBC-decrypt whole blocks of src into dst. No unpadding.
         
-        plaintext = bytearray()
-        prev_block = self.iv
+        Args:
+            src: Readable buffer, a multiple of 16 bytes long
+            dst: Writable buffer at least as long as src
+            prev_words (tuple): Previous ciphertext block (or IV) as four words
+        """
+        if np is not None and len(src) // 16 >= self.batch_threshold:
+            # Block decryptions are independent in CBC, so run them all at once
+            cipher_blocks = np.frombuffer(src, dtype=np.uint8).reshape(-1, 16)
+            decrypted = self.aes.decrypt_blocks(cipher_blocks)
+            decrypted[0] ^= np.frombuffer(_BLOCK.pack(*prev_words), dtype=np.uint8)
+            decrypted[1:] ^= cipher_blocks[:-1]
+            np.frombuffer(dst, dtype=np.uint8, count=decrypted.size)[:] = decrypted.reshape(-1)
+            return
         
-        for block in blocks:
-            # Decrypt
-            decrypted_block = self.aes.decrypt(block)
-            # XOR with previous ciphertext block (or IV for first block)
-            xored = bytes(x ^ y for x, y in zip(decrypted_block, prev_block))
-            # Add to result
-            plaintext.extend(xored)
-            # Update previous block
-            prev_block = block
+        decrypt_words = self.aes._words_function(encrypt=False)
+        unpack_from = _BLOCK.unpack_from
+        pack_into = _BLOCK.pack_into
+        p0, p1, p2, p3 = prev_words
         
-        return unpad_pkcs7(bytes(plaintext))
+        for offset in range(0, len(src), 16):
+            # Decrypt, then XOR with previous ciphertext block (or IV for first block)
+            c0, c1, c2, c3 = unpack_from(src, offset)
+            s0, s1, s2, s3 = decrypt_words(c0, c1, c2, c3)
+            pack_into(dst, offset, s0 ^ p0, s1 ^ p1, s2 ^ p2, s3 ^ p3)
+            p0, p1, p2, p3 = c0, c1, c2, c3
 
 
-# Example usage
-if __name__ == "__main__":
-    import os
-    
-    # Generate random key and IV
-    key = os.urandom(16)  # 128-bit key
-    iv = os.urandom(16)   # 16-byte IV
-    
-    # Create AES-CBC instance
-    aes_cbc = AES_CBC(key, iv)
-    
-    # Example plaintext
-    plaintext = b"This is a secret message that needs to be encrypted using AES!"
-    
-    # Encrypt
-    ciphertext = aes_cbc.encrypt(plaintext)
-    print("Ciphertext:", ciphertext.hex())
-    
-    # Decrypt
-    decrypted = aes_cbc.decrypt(ciphertext)
-    print("Decrypted:", decrypted.decode())
+class CBCEncryptor:
+    """
+    Incremental AES-CBC encryption.
     
-    # Verify
-    assert decrypted == plaintext, "Decryption failed!"
-    print("Encryption and decryption successful!")
\ No newline at end of file
+    Only the chaining block and a partial block are kept between calls, so
+    memory use does not depend on the total input size. PKCS#7 padding is
+    added by finalize().
+    """
+    def __init__(self, cipher):
+        """
+        Args:
+            cipher (AES_CBC): Cipher providing the key and IV
+        """
+        self.cipher = cipher
+        self._prev_block = cipher.iv
+        self._buffer = b""
+        self._finalized = False
+
+    def update(self, data):
+        """
+        Encrypt the next chunk of plaintext.
+        
+        Args:
+            data (bytes): Plaintext chunk of any length
+        
+        Returns:
+            bytes: Ciphertext for every complete block available so far
+        """
+        if self._finalized:
+            raise ValueError("Encryptor has already been finalized")
+        
+        data = self._buffer + bytes(data)
+        full = len(data) - len(data) % 16
+        self._buffer = data[full:]
+        if not full:
+            return b""
+        
+        ciphertext = self.cipher._encrypt_chain(data[:full], self._prev_block)
+        self._prev_block = ciphertext[-16:]
+        return ciphertext
+
+    def finalize(self):
+        """
+        Pad and encrypt the remaining partial block.
+        
+        Returns:
+            bytes: The final ciphertext block(s)
+        """
+        if self._finalized:
+            raise ValueError("Encryptor has already been finalized")
+        
+        self._finalized = True
+        return self.cipher._encrypt_chain(pad_pkcs7(self._buffer), self._prev_block)
+
+
+class CBCDecryptor:
+    """
+    Incremental AES-CBC decryption.
+    
+    The last complete block is held back until finalize(), where its PKCS#7
+    padding is checked and removed.
+    """
+    def __init__(self, cipher):
+        """
+        Args:
+            cipher (AES_CBC): Cipher providing the key and IV
+        """
+        self.cipher = cipher
+        self._prev_block = cipher.iv
+        self._buffer = b""
+        self._finalized = False
+
+    def update(self, data):
+        """
+        Decrypt the next chunk of ciphertext.
+        
+        Args:
+            data (bytes): Ciphertext chunk of any length
+        
+        Returns:
+            bytes: Plaintext for every block that cannot be the padding block
+        """
+        if self._finalized:
+            raise ValueError("Decryptor has already been finalized")
+        
+        data = self._buffer + bytes(data)
+        # Keep the trailing partial block, or the last full block if there is none
+        keep = len(data) % 16 or 16
+        ready = max(len(data) - keep, 0)
+        self._buffer = data[ready:]
+        if not ready:
+            return b""
+        
+        plaintext = self.cipher._decrypt_chain(data[:ready], self._prev_block)
+        self._prev_block = data[ready - 16:ready]
+        return plaintext
+
+    def finalize(self):
+        """
+        Decrypt the held-back block and remove the padding.
+        
+        Returns:
+            bytes: The final plaintext bytes
+        """
+        if self._finalized:
+            raise ValueError("Decryptor has already been finalized")
+        
+        self._finalized = True
+        if len(self._buffer) != 16:
+            raise ValueError("Ciphertext length must be a multiple of 16 bytes")
+        return unpad_pkcs7(self.cipher._decrypt_chain(self._buffer, self._prev_block))
+
+
+def multi_buffer_cbc_encrypt(aes, messages, ivs):
+    """
+    CBC-encrypt many independent messages together.
+    
+    CBC cannot be parallelized within one message, but block i of every
+    message can be encrypted at the same time. Each step advances all
+    messages that still have a block i through one call of the batched
+    block core. Messages are ordered by length, so the set of messages still
+    running is always a prefix and ragged lengths are masked by slicing.
+    Without NumPy every message is encrypted on its own.
+    
+    Args:
+        aes (AES): Block cipher
+        messages (list): Plaintext messages (bytes)
+        ivs (list): 16-byte initialization vectors, one per message
+    
+    Returns:
+        list: PKCS#7-padded CBC ciphertexts, in the order of messages
+    """
+    if len(messages) != len(ivs):
+        raise ValueError("Need exactly one IV per message")
+    if any(len(iv) != 16 for iv in ivs):
+        raise ValueError("IV must be 16 bytes")
+    
+    padded = [pad_pkcs7(message) for message in messages]
+    
+    if np is None:
+        results = []
+        for data, iv in zip(padded, ivs):
+            ciphertext = bytearray()
+            prev_block = iv
+            for i in range(0, len(data), 16):
+                prev_block = aes.encrypt(xor_bytes(data[i:i+16], prev_block))
+                ciphertext.extend(prev_block)
+            results.append(bytes(ciphertext))
+        return results
+    
+    # Longest message first; all messages are stored back to back
+    order = sorted(range(len(padded)), key=lambda j: len(padded[j]), reverse=True)
+    counts = np.array([len(padded[j]) // 16 for j in order], dtype=np.intp)
+    starts = np.zeros(len(order), dtype=np.intp)
+    np.cumsum(counts[:-1], out=starts[1:])
+    
+    data = np.frombuffer(b"".join(padded[j] for j in order), dtype=np.uint8).reshape(-1, 16)
+    out = np.empty_like(data)
+    state = np.frombuffer(b"".join(ivs[j] for j in order), dtype=np.uint8).reshape(-1, 16).copy()
+    
+    for i in range(int(counts[0]) if len(order) else 0):
+        # Messages with more than i blocks are the first `active` ones
+        active = int(np.count_nonzero(counts > i))
+        rows = starts[:active] + i
+        state = aes.encrypt_blocks(state[:active] ^ data[rows])
+        out[rows] = state
+    
+    results = [None] * len(order)
+    for j, start, count in zip(order, starts, counts):
+        results[j] = out[start:start + count].tobytes()
+    return results
+
+
+def xor_bytes(a, b):
+    """
+    XOR two byte strings of equal length.
+    
+    Args:
+        a (bytes): First operand
+        b (bytes): Second operand
+    
+    Returns:
+        bytes: a XOR b
+    """
+    n = len(a)
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(n, 'big')
+
+
+def ctr_keystream(aes, counter, first_block, num_blocks):
+    """
+    Generate a range of CTR keystream blocks.
+    
+    Block i of the keystream is the encryption of (counter + i) mod 2^128,
+    written as a 16-byte big-endian counter block.
+    
+    Args:
+        aes (AES): Block cipher
+        counter (int): Initial counter block as an integer
+        first_block (int): Index of the first keystream block to generate
+        num_blocks (int): Number of keystream blocks to generate
+    
+    Returns:
+        bytes: 16 * num_blocks bytes of keystream
+    """
+    mask = (1 << 128) - 1
+    counters = b"".join(
+        ((counter + i) & mask).to_bytes(16, 'big')
+        for i in range(first_block, first_block + num_blocks)
+    )
+    if np is not None and num_blocks >= AES_CTR.batch_threshold:
+        blocks = np.frombuffer(counters, dtype=np.uint8).reshape(-1, 16)
+        return aes.encrypt_blocks(blocks).tobytes()
+    return b"".join(aes.encrypt(counters[i:i+16]) for i in range(0, len(counters), 16))
+
+
+# Per-process AES, set once by _init_ctr_worker when the pool starts
+_ctr_worker_aes = None
+
+
+def _init_ctr_worker(key, key_size, block_core=None):
+    """Pool initializer: expand the key once per worker process."""
+    global _ctr_worker_aes
+    _ctr_worker_aes = AES(key, key_size, block_core=block_core)
+
+
+def _ctr_xor_range(aes, counter, src, dst, start, end, length):
+    """
+    XOR blocks [start, end) of src with the CTR keystream, writing into dst.
+    
+    The last block may be partial; length is the total message length.
+    """
+    lo = 16 * start
+    hi = min(16 * end, length)
+    keystream = ctr_keystream(aes, counter, start, end - start)
+    if np is not None:
+        out = np.frombuffer(dst, dtype=np.uint8, count=hi - lo, offset=lo)
+        out[:] = (np.frombuffer(src, dtype=np.uint8, count=hi - lo, offset=lo) ^
+                  np.frombuffer(keystream, dtype=np.uint8, count=hi - lo))
+    else:
+        dst[lo:hi] = xor_bytes(src[lo:hi], keystream[:hi - lo])
+
+
+def _ctr_xor_worker(args):
+    """Pool task: encrypt one block range between shared memory segments."""
+    src_name, dst_name, counter, start, end, length = args
+    from multiprocessing import shared_memory
+    
+    src = shared_memory.SharedMemory(name=src_name)
+    dst = shared_memory.SharedMemory(name=dst_name)
+    try:
+        _ctr_xor_range(_ctr_worker_aes, counter, src.buf, dst.buf, start, end, length)
+    finally:
+        src.close()
+        dst.close()
+
+
+class AES_CTR:
+    """
+    AES in Counter (CTR) mode.
+    
+    Every keystream block depends only on its counter value, so large
+    inputs are split into counter ranges that are encrypted in parallel
+    by a process pool. Encryption and decryption are the same operation.
+    
+    The worker pool is started on first use and kept for the lifetime of the
+    object, so repeated calls do not pay for process start-up. Call close()
+    or use the object as a context manager to shut the pool down.
+    """
+    # Inputs with at least this many blocks are encrypted with the batched
+    # NumPy core when it is available
+    batch_threshold = 32
+    # Inputs with at least this many blocks are split across worker processes
+    parallel_threshold = 4096
+
+    def __init__(self, key, iv, key_size=128, num_workers=None, block_core=None):
+        """
+        Initialize AES-CTR with key and initial counter block.
+        
+        Args:
+            key (bytes): Encryption/decryption key
+            iv (bytes): 16-byte initial counter block
+            key_size (int): Key size in bits, can be 128, 192, or 256
+            num_workers (int): Number of worker processes (defaults to CPU count)
+            block_core (str): Batched core for the keystream, "lookup" or
+                "bitsliced" (defaults to AES.default_block_core)
+        """
+        if len(iv) != 16:
+            raise ValueError("IV must be 16 bytes")
+        
+        self.aes = AES(key, key_size, block_core=block_core)
+        self.iv = iv
+        self.counter = int.from_bytes(iv, 'big')
+        self.num_workers = num_workers if num_workers else os.cpu_count() or 1
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self):
+        """Return the worker pool, starting it on first use."""
+        if self._pool is None:
+            from multiprocessing import Pool
+            self._pool = Pool(processes=self.num_workers, initializer=_init_ctr_worker,
+                              initargs=(self.aes.key, self.aes.key_size, self.aes.block_core))
+        return self._pool
+
+    def encrypt(self, plaintext):
+        """
+        Encrypt data using AES-CTR. No padding is applied, so the ciphertext
+        has the same length as the plaintext.
+        
+        Args:
+            plaintext (bytes): Data to encrypt
+        
+        Returns:
+            bytes: Encrypted data
+        """
+        return self._crypt(self.counter, plaintext)
+
+    def decrypt(self, ciphertext):
+        """
+        Decrypt data using AES-CTR (the same operation as encrypt).
+        
+        Args:
+            ciphertext (bytes): Data to decrypt
+        
+        Returns:
+            bytes: Decrypted data
+        """
+        return self.encrypt(ciphertext)
+
+    def encrypt_at(self, first_block, data):
+        """
+        Encrypt or decrypt data that starts at a keystream block other than 0.
+        
+        Lets a long message be processed in pieces, or part of it be
+        decrypted on its own, with the same worker pool.
+        
+        Args:
+            first_block (int): Index of the keystream block for data[0:16]
+            data (bytes): Data to encrypt or decrypt
+        
+        Returns:
+            bytes: data XOR the keystream from block first_block on
+        """
+        if first_block < 0:
+            raise ValueError("Block index must not be negative")
+        return self._crypt((self.counter + first_block) & ((1 << 128) - 1), data)
+
+    def _crypt(self, counter, plaintext):
+        """XOR data with the keystream of the given initial counter, in parallel when large."""
+        length = len(plaintext)
+        num_blocks = (length + 15) // 16
+        
+        if self.num_workers <= 1 or num_blocks < self.parallel_threshold:
+            keystream = ctr_keystream(self.aes, counter, 0, num_blocks)
+            return xor_bytes(plaintext, keystream[:length])
+        
+        from multiprocessing import shared_memory
+        
+        # Workers read the input from one shared segment and write the output
+        # into another, so only block offsets are pickled
+        src = shared_memory.SharedMemory(create=True, size=length)
+        dst = shared_memory.SharedMemory(create=True, size=length)
+        try:
+            src.buf[:length] = plaintext
+            
+            # One contiguous counter range per worker
+            per_worker = -(-num_blocks // self.num_workers)
+            tasks = [(src.name, dst.name, counter, start, min(start + per_worker, num_blocks), length)
+                     for start in range(0, num_blocks, per_worker)]
+            self._get_pool().map(_ctr_xor_worker, tasks)
+            
+            return bytes(dst.buf[:length])
+        finally:
+            src.close()
+            src.unlink()
+            dst.close()
+            dst.unlink()
+
+
+def _gf128_mul_x(v):
+    """Multiply a GCM field element by x (a right shift in GCM's bit order)."""
+    if v & 1:
+        return (v >> 1) ^ (0xE1 << 120)
+    return v >> 1
+
+
+def _build_ghash_reduce():
+    """Reduction terms for the 8 low bits shifted out by a multiply by x^8."""
+    table = []
+    for low in range(256):
+        v = low
+        for _ in range(8):
+            v = _gf128_mul_x(v)
+        table.append(v)
+    return tuple(table)
+
+
+_GHASH_REDUCE = _build_ghash_reduce()
+
+
+def ghash_table(h):
+    """
+    Build the 8-bit Shoup table for GHASH with hash subkey h.
+    
+    Entry b is the field product of byte b (placed in the first byte of a
+    block) and h, so a full multiply by h takes 16 table lookups.
+    
+    Args:
+        h (int): Hash subkey E(K, 0^128) as a big-endian integer
+    
+    Returns:
+        tuple: 256 field elements
+    """
+    table = [0] * 256
+    bit = 0x80
+    while bit:
+        table[bit] = h
+        h = _gf128_mul_x(h)
+        bit >>= 1
+    for b in range(3, 256):
+        low = b & -b
+        if b != low:
+            table[b] = table[low] ^ table[b ^ low]
+    return tuple(table)
+
+
+def ghash_blocks(table, y, data):
+    """
+    Fold whole blocks into a GHASH state.
+    
+    Args:
+        table (tuple): Shoup table from ghash_table
+        y (int): Current GHASH state
+        data (bytes): Input, a multiple of 16 bytes long
+    
+    Returns:
+        int: The updated GHASH state
+    """
+    reduce = _GHASH_REDUCE
+    for offset in range(0, len(data), 16):
+        x = (y ^ int.from_bytes(data[offset:offset+16], 'big')).to_bytes(16, 'big')
+        # Horner's rule from the last byte: z = z * x^8 + x[i] * H
+        y = table[x[15]]
+        for b in x[14::-1]:
+            y = (y >> 8) ^ reduce[y & 0xFF] ^ table[b]
+    return y
+
+
+class AES_GCM:
+    """
+    AES in Galois/Counter Mode (NIST SP 800-38D).
+    
+    The payload is encrypted with a 32-bit counter, reusing the CTR
+    keystream code (batched and, for large inputs, split across worker
+    processes), and authenticated by GHASH in the same pass. The GHASH
+    table depends only on the key, so it is kept on the cached key schedule.
+    encrypt() returns the ciphertext with the 16-byte tag appended.
+    
+    Large payloads use the worker pool of an internal AES_CTR, started on
+    first use and kept; call close() or use the object as a context manager
+    to shut it down.
+    """
+    tag_size = 16
+
+    def __init__(self, key, iv, key_size=128, num_workers=None):
+        """
+        Initialize AES-GCM with key and IV.
+        
+        Args:
+            key (bytes): Encryption/decryption key
+            iv (bytes): Non-empty IV; 12 bytes is recommended, and must never
+                be reused with the same key
+            key_size (int): Key size in bits, can be 128, 192, or 256
+            num_workers (int): Number of worker processes for large inputs
+                (defaults to CPU count)
+        """
+        if not iv:
+            raise ValueError("IV must not be empty")
+        
+        self.aes = AES(key, key_size)
+        self.iv = iv
+        self.num_workers = num_workers if num_workers else os.cpu_count() or 1
+        
+        schedule = self.aes.schedule
+        if schedule.ghash is None:
+            h = int.from_bytes(self.aes.encrypt(bytes(16)), 'big')
+            schedule.ghash = ghash_table(h)
+        self.table = schedule.ghash
+        
+        # Pre-counter block J0: IV || 0^31 || 1 for 96-bit IVs, else GHASH of the IV
+        if len(iv) == 12:
+            self.j0 = (int.from_bytes(iv, 'big') << 32) | 1
+        else:
+            padded = iv + bytes(-len(iv) % 16) + (8 * len(iv)).to_bytes(16, 'big')
+            self.j0 = ghash_blocks(self.table, 0, padded)
+        
+        # Keystream for large payloads; its counter is passed per call
+        self._ctr = AES_CTR(key, self.j0.to_bytes(16, 'big'), key_size, self.num_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        self._ctr.close()
+
+    def encrypt(self, plaintext, aad=b""):
+        """
+        Encrypt and authenticate data.
+        
+        Args:
+            plaintext (bytes): Data to encrypt
+            aad (bytes): Additional data that is authenticated but not encrypted
+        
+        Returns:
+            bytes: Ciphertext followed by the 16-byte tag
+        """
+        encryptor = self.encryptor(aad)
+        ciphertext = encryptor.update(plaintext)
+        encryptor.finalize()
+        return ciphertext + encryptor.tag
+
+    def decrypt(self, data, aad=b""):
+        """
+        Verify and decrypt data produced by encrypt().
+        
+        Args:
+            data (bytes): Ciphertext followed by the 16-byte tag
+            aad (bytes): The additional data passed to encrypt()
+        
+        Returns:
+            bytes: Decrypted data
+        """
+        if len(data) < self.tag_size:
+            raise ValueError("Data is shorter than the authentication tag")
+        
+        decryptor = self.decryptor(aad)
+        plaintext = decryptor.update(data[:-self.tag_size])
+        decryptor.finalize(data[-self.tag_size:])
+        return plaintext
+
+    def encryptor(self, aad=b""):
+        """
+        Returns:
+            GCMEncryptor: Incremental encryptor for this key and IV
+        """
+        return GCMEncryptor(self, aad)
+
+    def decryptor(self, aad=b""):
+        """
+        Returns:
+            GCMDecryptor: Incremental decryptor for this key and IV
+        """
+        return GCMDecryptor(self, aad)
+
+    def _keystream_xor(self, data, first_block):
+        """
+        XOR data with the GCM keystream starting at the given block index.
+        
+        Block i uses the counter inc32^(i+1)(J0): only the low 32 bits
+        count, wrapping within the high 96 bits.
+        """
+        length = len(data)
+        num_blocks = (length + 15) // 16
+        prefix = self.j0 & ~0xFFFFFFFF
+        start = (self.j0 + 1 + first_block) & 0xFFFFFFFF
+        # Blocks before the low 32 bits wrap around
+        head = min(num_blocks, (1 << 32) - start)
+        
+        if (head == num_blocks and self.num_workers > 1 and
+                num_blocks >= AES_CTR.parallel_threshold):
+            return self._ctr._crypt(prefix | start, data)
+        
+        keystream = ctr_keystream(self.aes, prefix | start, 0, head)
+        if head < num_blocks:
+            keystream += ctr_keystream(self.aes, prefix, 0, num_blocks - head)
+        return xor_bytes(data, keystream[:length])
+
+    def _tag(self, y, aad_len, data_len):
+        """Finish GHASH with the length block and encrypt it with J0."""
+        lengths = ((8 * aad_len) << 64) | (8 * data_len)
+        y = ghash_blocks(self.table, y, lengths.to_bytes(16, 'big'))
+        return xor_bytes(self.aes.encrypt(self.j0.to_bytes(16, 'big')), y.to_bytes(16, 'big'))
+
+
+class GCMEncryptor:
+    """
+    Incremental AES-GCM encryption.
+    
+    Each update() returns ciphertext of the same length as its input; the
+    tag is available as the tag attribute after finalize().
+    """
+    def __init__(self, cipher, aad=b""):
+        """
+        Args:
+            cipher (AES_GCM): Cipher providing the key, IV and GHASH table
+            aad (bytes): Additional authenticated data
+        """
+        self.cipher = cipher
+        self.tag = None
+        self._aad_len = len(aad)
+        self._y = ghash_blocks(cipher.table, 0, aad + bytes(-len(aad) % 16))
+        self._length = 0
+        # Ciphertext of a trailing partial block, not yet hashed
+        self._buffer = b""
+        self._finalized = False
+
+    def update(self, data):
+        """
+        Encrypt the next chunk of plaintext.
+        
+        Args:
+            data (bytes): Plaintext chunk of any length
+        
+        Returns:
+            bytes: Ciphertext for the chunk
+        """
+        if self._finalized:
+            raise ValueError("Encryptor has already been finalized")
+        
+        output = self._crypt(data)
+        self._hash(output)
+        return output
+
+    def finalize(self):
+        """
+        Finish authentication and set the tag attribute.
+        
+        Returns:
+            bytes: Always empty; GCM has no padding
+        """
+        if self._finalized:
+            raise ValueError("Encryptor has already been finalized")
+        
+        self._finalized = True
+        self.tag = self._finish()
+        return b""
+
+    def _crypt(self, data):
+        """XOR data with the keystream, continuing from the bytes already processed."""
+        if not data:
+            return b""
+        
+        data = bytes(data)
+        # Realign to a block boundary if the previous chunk ended mid-block
+        skip = self._length % 16
+        output = self.cipher._keystream_xor(bytes(skip) + data, self._length // 16)[skip:]
+        self._length += len(data)
+        return output
+
+    def _hash(self, ciphertext):
+        """Fold ciphertext into GHASH, keeping back any trailing partial block."""
+        data = self._buffer + ciphertext
+        full = len(data) - len(data) % 16
+        self._y = ghash_blocks(self.cipher.table, self._y, data[:full])
+        self._buffer = data[full:]
+
+    def _finish(self):
+        """Hash the padded final block and return the tag."""
+        y = ghash_blocks(self.cipher.table, self._y, self._buffer + bytes(-len(self._buffer) % 16))
+        return self.cipher._tag(y, self._aad_len, self._length)
+
+
+class GCMDecryptor(GCMEncryptor):
+    """
+    Incremental AES-GCM decryption.
+    
+    Plaintext is returned as it is decrypted, before the tag has been
+    checked, so callers must not act on it until finalize() succeeds.
+    """
+    def update(self, data):
+        """
+        Decrypt the next chunk of ciphertext.
+        
+        Args:
+            data (bytes): Ciphertext chunk of any length
+        
+        Returns:
+            bytes: Plaintext for the chunk
+        """
+        if self._finalized:
+            raise ValueError("Decryptor has already been finalized")
+        
+        self._hash(bytes(data))
+        return self._crypt(data)
+
+    def finalize(self, tag):
+        """
+        Check the authentication tag.
+        
+        Args:
+            tag (bytes): The 16-byte tag produced by encryption
+        
+        Returns:
+            bytes: Always empty; GCM has no padding
+        """
+        if self._finalized:
+            raise ValueError("Decryptor has already been finalized")
+        
+        self._finalized = True
+        self.tag = self._finish()
+        import hmac
+        
+        if not hmac.compare_digest(self.tag, bytes(tag)):
+            raise ValueError("Authentication tag does not match")
+        return b""
+
+
+def xts_tweaks(tweak_aes, first_sector, num_sectors, blocks_per_sector):
+    """
+    Compute the XTS tweak of every block in a range of sectors.
+    
+    The first tweak of sector n is E(K2, n) with n as a 16-byte little-endian
+    number; each following block multiplies the previous tweak by x in
+    GF(2^128). The multiply is done for all sectors at once, one step per
+    block position.
+    
+    Args:
+        tweak_aes (AES): Cipher keyed with the tweak key K2
+        first_sector (int): First sector number
+        num_sectors (int): Number of sectors
+        blocks_per_sector (int): Number of 16-byte blocks per sector
+    
+    Returns:
+        numpy.ndarray: (num_sectors * blocks_per_sector, 16) uint8 tweaks
+    """
+    numbers = b"".join(n.to_bytes(16, 'little')
+                       for n in range(first_sector, first_sector + num_sectors))
+    first = tweak_aes.encrypt_blocks(np.frombuffer(numbers, dtype=np.uint8).reshape(-1, 16))
+    
+    tweak = np.ascontiguousarray(first).view('<u8').copy()
+    lo, hi = tweak[:, 0], tweak[:, 1]
+    tweaks = np.empty((num_sectors, blocks_per_sector, 2), dtype='<u8')
+    for j in range(blocks_per_sector):
+        tweaks[:, j, 0] = lo
+        tweaks[:, j, 1] = hi
+        # Multiply by x: shift the 128-bit little-endian value left, reducing by 0x87
+        carry = hi >> np.uint64(63)
+        hi <<= np.uint64(1)
+        hi |= lo >> np.uint64(63)
+        lo <<= np.uint64(1)
+        lo ^= carry * np.uint64(0x87)
+    return tweaks.view(np.uint8).reshape(-1, 16)
+
+
+# Per-process AES_XTS, set once by _init_xts_worker when the pool starts
+_xts_worker_cipher = None
+
+
+def _init_xts_worker(key, sector_size, key_size):
+    """Pool initializer: expand both keys once per worker process."""
+    global _xts_worker_cipher
+    _xts_worker_cipher = AES_XTS(key, sector_size, key_size, num_workers=1)
+
+
+def _xts_worker(args):
+    """Pool task: process one sector range between shared memory segments."""
+    src_name, dst_name, first_sector, start, end, encrypt = args
+    from multiprocessing import shared_memory
+    
+    src = shared_memory.SharedMemory(name=src_name)
+    dst = shared_memory.SharedMemory(name=dst_name)
+    try:
+        _xts_worker_cipher._crypt_range(src.buf, dst.buf, first_sector, start, end, encrypt)
+    finally:
+        src.close()
+        dst.close()
+
+
+class AES_XTS:
+    """
+    AES in XTS mode (IEEE 1619 / NIST SP 800-38E) for sector-addressed storage.
+    
+    Each sector is encrypted independently under a tweak derived from its
+    sector number, so any sector of a volume image can be read or rewritten
+    without touching the rest. Ranges of sectors are processed as one
+    batch, and large ranges are split across worker processes.
+    
+    The worker pool is started on first use and kept for the lifetime of the
+    object. Call close() or use the object as a context manager to shut the
+    pool down.
+    """
+    # Ranges with at least this many blocks use the batched NumPy core when available
+    batch_threshold = 32
+    # Ranges with at least this many blocks are split across worker processes
+    parallel_threshold = 4096
+
+    def __init__(self, key, sector_size=512, key_size=128, num_workers=None):
+        """
+        Initialize AES-XTS with a double-length key.
+        
+        Args:
+            key (bytes): Data key K1 followed by tweak key K2
+            sector_size (int): Bytes per sector, a multiple of 16
+            key_size (int): Size of each half of the key in bits, 128 or 256
+            num_workers (int): Number of worker processes (defaults to CPU count)
+        """
+        if key_size not in (128, 256):
+            raise ValueError("XTS key size must be 128 or 256 bits")
+        if len(key) * 8 != 2 * key_size:
+            raise ValueError(f"Key length should be {key_size // 4} bytes")
+        if sector_size < 16 or sector_size % 16:
+            raise ValueError("Sector size must be a positive multiple of 16 bytes")
+        
+        half = key_size // 8
+        if key[:half] == key[half:]:
+            raise ValueError("The data and tweak halves of the key must differ")
+        
+        self.key = key
+        self.key_size = key_size
+        self.aes = AES(key[:half], key_size)
+        self.tweak_aes = AES(key[half:], key_size)
+        self.sector_size = sector_size
+        self.blocks_per_sector = sector_size // 16
+        self.num_workers = num_workers if num_workers else os.cpu_count() or 1
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self):
+        """Return the worker pool, starting it on first use."""
+        if self._pool is None:
+            from multiprocessing import Pool
+            self._pool = Pool(processes=self.num_workers, initializer=_init_xts_worker,
+                              initargs=(self.key, self.sector_size, self.key_size))
+        return self._pool
+
+    def encrypt_sector(self, sector, plaintext):
+        """
+        Encrypt one sector.
+        
+        Args:
+            sector (int): Sector number
+            plaintext (bytes): sector_size bytes of data
+        
+        Returns:
+            bytes: Encrypted sector
+        """
+        if len(plaintext) != self.sector_size:
+            raise ValueError(f"Sector data must be {self.sector_size} bytes")
+        return self.encrypt_sectors(sector, plaintext)
+
+    def decrypt_sector(self, sector, ciphertext):
+        """
+        Decrypt one sector.
+        
+        Args:
+            sector (int): Sector number
+            ciphertext (bytes): sector_size bytes of encrypted data
+        
+        Returns:
+            bytes: Decrypted sector
+        """
+        if len(ciphertext) != self.sector_size:
+            raise ValueError(f"Sector data must be {self.sector_size} bytes")
+        return self.decrypt_sectors(sector, ciphertext)
+
+    def encrypt_sectors(self, first_sector, plaintext):
+        """
+        Encrypt consecutive sectors.
+        
+        Args:
+            first_sector (int): Number of the first sector
+            plaintext (bytes): Data, a multiple of sector_size bytes
+        
+        Returns:
+            bytes: Encrypted sectors
+        """
+        return self._crypt(first_sector, plaintext, True)
+
+    def decrypt_sectors(self, first_sector, ciphertext):
+        """
+        Decrypt consecutive sectors.
+        
+        Args:
+            first_sector (int): Number of the first sector
+            ciphertext (bytes): Encrypted data, a multiple of sector_size bytes
+        
+        Returns:
+            bytes: Decrypted sectors
+        """
+        return self._crypt(first_sector, ciphertext, False)
+
+    def read_sectors(self, f, first_sector, count):
+        """
+        Read and decrypt sectors from an encrypted image.
+        
+        Args:
+            f: Binary file object opened for reading
+            first_sector (int): Number of the first sector
+            count (int): Number of sectors to read
+        
+        Returns:
+            bytes: Decrypted sectors
+        """
+        f.seek(first_sector * self.sector_size)
+        ciphertext = f.read(count * self.sector_size)
+        if len(ciphertext) != count * self.sector_size:
+            raise ValueError("Image ends before the last requested sector")
+        return self.decrypt_sectors(first_sector, ciphertext)
+
+    def write_sectors(self, f, first_sector, plaintext):
+        """
+        Encrypt sectors and write them in place into an image.
+        
+        Args:
+            f: Binary file object opened for writing (e.g. mode "r+b")
+            first_sector (int): Number of the first sector
+            plaintext (bytes): Data, a multiple of sector_size bytes
+        """
+        ciphertext = self.encrypt_sectors(first_sector, plaintext)
+        f.seek(first_sector * self.sector_size)
+        f.write(ciphertext)
+
+    def _crypt(self, first_sector, data, encrypt):
+        """Encrypt or decrypt whole sectors, in parallel for large ranges."""
+        length = len(data)
+        if length % self.sector_size:
+            raise ValueError(f"Data length must be a multiple of {self.sector_size} bytes")
+        if first_sector < 0:
+            raise ValueError("Sector number must not be negative")
+        
+        num_sectors = length // self.sector_size
+        num_blocks = length // 16
+        if self.num_workers <= 1 or num_sectors < 2 or num_blocks < self.parallel_threshold:
+            out = bytearray(length)
+            self._crypt_range(data, out, first_sector, 0, num_sectors, encrypt)
+            return bytes(out)
+        
+        from multiprocessing import shared_memory
+        
+        # Same layout as AES_CTR: shared input and output segments, with only
+        # sector offsets pickled
+        src = shared_memory.SharedMemory(create=True, size=length)
+        dst = shared_memory.SharedMemory(create=True, size=length)
+        try:
+            src.buf[:length] = data
+            
+            per_worker = -(-num_sectors // self.num_workers)
+            tasks = [(src.name, dst.name, first_sector, start,
+                      min(start + per_worker, num_sectors), encrypt)
+                     for start in range(0, num_sectors, per_worker)]
+            self._get_pool().map(_xts_worker, tasks)
+            
+            return bytes(dst.buf[:length])
+        finally:
+            src.close()
+            src.unlink()
+            dst.close()
+            dst.unlink()
+
+    def _crypt_range(self, src, dst, first_sector, start, end, encrypt):
+        """
+        Process sectors [start, end) of src into dst.
+        
+        Sector start of the buffers is sector number first_sector + start.
+        """
+        lo = start * self.sector_size
+        hi = end * self.sector_size
+        num_blocks = (hi - lo) // 16
+        
+        if np is not None and num_blocks >= self.batch_threshold:
+            tweaks = xts_tweaks(self.tweak_aes, first_sector + start, end - start,
+                                self.blocks_per_sector)
+            blocks = np.frombuffer(src, dtype=np.uint8, count=hi - lo, offset=lo).reshape(-1, 16)
+            if encrypt:
+                result = self.aes.encrypt_blocks(blocks ^ tweaks)
+            else:
+                result = self.aes.decrypt_blocks(blocks ^ tweaks)
+            result ^= tweaks
+            np.frombuffer(dst, dtype=np.uint8, count=hi - lo, offset=lo)[:] = result.reshape(-1)
+            return
+        
+        crypt_block = self.aes.encrypt if encrypt else self.aes.decrypt
+        mask = (1 << 128) - 1
+        offset = lo
+        for sector in range(first_sector + start, first_sector + end):
+            tweak = int.from_bytes(self.tweak_aes.encrypt(sector.to_bytes(16, 'little')), 'little')
+            for _ in range(self.blocks_per_sector):
+                t = tweak.to_bytes(16, 'little')
+                block = xor_bytes(bytes(src[offset:offset + 16]), t)
+                dst[offset:offset + 16] = xor_bytes(crypt_block(block), t)
+                # Multiply the tweak by x in GF(2^128)
+                tweak = ((tweak << 1) & mask) ^ (0x87 if tweak >> 127 else 0)
+                offset += 16
+
+
+# Example usage
+if __name__ == "__main__":
+    # Generate random key and IV
+    key = os.urandom(16)  # 128-bit key
+    iv = os.urandom(16)   # 16-byte IV
+    
+    # Create AES-CBC instance
+    aes_cbc = AES_CBC(key, iv)
+    
+    # Example plaintext
+    plaintext = b"This is a secret message that needs to be encrypted using AES!"
+    
+    # Encrypt
+    ciphertext = aes_cbc.encrypt(plaintext)
+    print("Ciphertext:", ciphertext.hex())
+    
+    # Decrypt
+    decrypted = aes_cbc.decrypt(ciphertext)
+    print("Decrypted:", decrypted.decode())
+    
+    # Verify
+    assert decrypted == plaintext, "Decryption failed!"
+    print("Encryption and decryption successful!")
+    
+    # Counter mode needs no padding
+    aes_ctr = AES_CTR(key, iv)
+    ciphertext = aes_ctr.encrypt(plaintext)
+    assert len(ciphertext) == len(plaintext)
+    assert aes_ctr.decrypt(ciphertext) == plaintext, "CTR decryption failed!"
+    print("CTR encryption and decryption successful!")
+    
+    # The bitsliced core gives the same results without data-dependent table lookups
+    if np is not None:
+        bulk = os.urandom(64 * 1024)
+        bitsliced_ctr = AES_CTR(key, iv, num_workers=1, block_core="bitsliced")
+        assert bitsliced_ctr.encrypt(bulk) == AES_CTR(key, iv, num_workers=1).encrypt(bulk)
+        bitsliced_cbc = AES_CBC(key, iv, block_core="bitsliced")
+        assert bitsliced_cbc.decrypt(aes_cbc.encrypt(bulk)) == bulk, "Bitsliced decryption failed!"
+        print("Bitsliced CTR and CBC decryption successful!")
+    
+    # Streaming: feed data in chunks of any size
+    encryptor = aes_cbc.encryptor()
+    chunks = [plaintext[i:i+7] for i in range(0, len(plaintext), 7)]
+    ciphertext = b"".join(encryptor.update(chunk) for chunk in chunks) + encryptor.finalize()
+    decryptor = aes_cbc.decryptor()
+    decrypted = decryptor.update(ciphertext[:40]) + decryptor.update(ciphertext[40:]) + decryptor.finalize()
+    assert ciphertext == aes_cbc.encrypt(plaintext) and decrypted == plaintext, "Streaming failed!"
+    print("Streaming encryption and decryption successful!")
+    
+    # GCM authenticates as it encrypts
+    iv = os.urandom(12)
+    aes_gcm = AES_GCM(key, iv)
+    sealed = aes_gcm.encrypt(plaintext, aad=b"header")
+    assert aes_gcm.decrypt(sealed, aad=b"header") == plaintext, "GCM decryption failed!"
+    try:
+        aes_gcm.decrypt(sealed[:-1] + bytes([sealed[-1] ^ 1]), aad=b"header")
+        raise AssertionError("GCM accepted a forged tag!")
+    except ValueError:
+        pass
+    print("GCM encryption and authentication successful!")
+    
+    # XTS encrypts each sector independently, so one sector can be rewritten alone
+    aes_xts = AES_XTS(os.urandom(32), sector_size=512)
+    image = os.urandom(4 * 512)
+    encrypted = aes_xts.encrypt_sectors(0, image)
+    assert aes_xts.decrypt_sector(2, encrypted[1024:1536]) == image[1024:1536], "XTS decryption failed!"
+    print("XTS sector encryption and decryption successful!")
@@ -0,0 +1,83 @@
+"""
+AES block cipher, modes of operation and accelerated backends.
+
+Importing the package loads only the pure-Python core (AES.py); NumPy is
+imported by the first batched operation. The multiprocessing, Numba and
+CUDA backends, the file and stream helpers, the asyncio batching front
+end and the backend registry are imported when one of their names is
+first accessed.
+
+The package attribute AES is the AES class, which shadows the submodule
+AES.py of the same name: `import Aes.AES as m` binds the class. Names from
+the module import as usual (`from Aes.AES import KeySchedule`), and the
+module object itself is importlib.import_module("Aes.AES") or
+sys.modules["Aes.AES"].
+"""
+# Binding the class replaces the submodule attribute set by this import
+from .AES import (
+    AES,
+    AES_CBC,
+    AES_CTR,
+    AES_GCM,
+    AES_XTS,
+    CBCDecryptor,
+    CBCEncryptor,
+    GCMDecryptor,
+    GCMEncryptor,
+    KeySchedule,
+    KeyScheduleCache,
+    ctr_keystream,
+    ghash_blocks,
+    ghash_table,
+    key_schedule_cache,
+    multi_buffer_cbc_encrypt,
+    pad_pkcs7,
+    unpad_pkcs7,
+    xor_bytes,
+    xts_tweaks,
+)
+
+# Name -> module for everything loaded on first access
+_LAZY_ATTRIBUTES = {
+    "ParallelAES_CBC": "aes_openMP",
+    "AES_CBC_Parallel": "aes_openMP(CTR)",
+    "AES_CTR_Parallel": "aes_openMP(CTR)",
+    "parallel_encrypt_messages": "aes_openMP(CTR)",
+    "CUDA_AES_CBC": "aes_cuda",
+    "CTRFile": "aes_file",
+    "read_key_file": "aes_file",
+    "StreamPipeline": "aes_cli",
+    "BatchingEncryptor": "aes_async",
+    "BackendRegistry": "aes_backends",
+    "create_cipher": "aes_backends",
+    "registry": "aes_backends",
+}
+
+__all__ = [
+    "AES", "AES_CBC", "AES_CTR", "AES_GCM", "AES_XTS",
+    "CBCDecryptor", "CBCEncryptor", "GCMDecryptor", "GCMEncryptor",
+    "KeySchedule", "KeyScheduleCache", "ctr_keystream", "ghash_blocks", "ghash_table",
+    "key_schedule_cache", "multi_buffer_cbc_encrypt", "pad_pkcs7", "unpad_pkcs7",
+    "xor_bytes", "xts_tweaks",
+] + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    if module_name == "aes_openMP(CTR)":
+        from ._lazy import load_sibling
+        module = load_sibling(__name__, "aes_openMP_CTR", "aes_openMP(CTR).py")
+    else:
+        import importlib
+        module = importlib.import_module(f"{__name__}.{module_name}")
+    
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,102 @@
+"""
+Helpers for loading optional dependencies and backend modules on first use.
+"""
+import sys
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    
+    After the import the module's attributes are copied onto the stand-in,
+    so later lookups cost the same as on the module itself.
+    """
+    def __init__(self, name):
+        """
+        Args:
+            name (str): Name of the module to import
+        """
+        self.__dict__["_lazy_name"] = name
+
+    def __getattr__(self, attr):
+        import importlib
+        
+        module = importlib.import_module(self._lazy_name)
+        self.__dict__.update(vars(module))
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._lazy_name!r}>"
+
+
+def module_available(name):
+    """
+    Check whether a top-level module is installed, without importing it.
+    
+    Args:
+        name (str): Module name
+    
+    Returns:
+        bool: True if an import of name would find the module
+    """
+    if name in sys.modules:
+        return True
+    for finder in sys.meta_path:
+        find_spec = getattr(finder, "find_spec", None)
+        if find_spec is not None and find_spec(name, None) is not None:
+            return True
+    return False
+
+
+def optional_module(name):
+    """
+    Return a LazyModule for an optional dependency.
+    
+    Args:
+        name (str): Module name
+    
+    Returns:
+        LazyModule: Stand-in for the module, or None if it is not installed
+    """
+    return LazyModule(name) if module_available(name) else None
+
+
+def load_sibling(package, module_name, file_name):
+    """
+    Import a module from the Aes directory by file name.
+    
+    Needed for aes_openMP(CTR).py, whose file name is not a valid module
+    name. The module is registered under the same top-level name whether
+    or not Aes is imported as a package, since Numba's kernel cache stores
+    that name; __package__ is set so that its relative imports still
+    resolve inside the package (the resulting "__package__ !=
+    __spec__.parent" ImportWarning is expected and silenced).
+    
+    Args:
+        package (str): __package__ of the caller ("Aes", or "" for scripts)
+        module_name (str): Name to register the module under
+        file_name (str): File name in the Aes directory
+    
+    Returns:
+        module: The loaded module
+    """
+    import importlib.util
+    import os
+    import warnings
+    
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    module.__package__ = package
+    sys.modules[module_name] = module
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ImportWarning)
+            spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -0,0 +1,192 @@
+
+import asyncio
+import os
+import time
+
+if __package__:
+    from .AES import AES, AES_CBC, multi_buffer_cbc_encrypt
+else:
+    from AES import AES, AES_CBC, multi_buffer_cbc_encrypt
+
+
+class BatchingEncryptor:
+    """
+    Asyncio front end that coalesces small AES-CBC encryptions.
+    
+    Concurrent encrypt() calls are collected for up to max_delay seconds,
+    or until max_batch messages or max_batch_bytes bytes are waiting, and
+    then encrypted together by one multi_buffer_cbc_encrypt() call in an
+    executor, so the event loop is never blocked by the cipher and the
+    executor hand-off is paid once per batch rather than once per message.
+    Every caller's future is resolved with its own ciphertext.
+    
+    Use the object as an async context manager, or call aclose(), to flush
+    the last batch and wait for batches still running.
+    """
+    def __init__(self, key, key_size=128, max_batch=256, max_batch_bytes=1 << 20,
+                 max_delay=0.001, executor=None):
+        """
+        Args:
+            key (bytes): Encryption key
+            key_size (int): Key size in bits, can be 128, 192, or 256
+            max_batch (int): Messages that trigger a batch without waiting
+            max_batch_bytes (int): Queued plaintext bytes that trigger a batch
+            max_delay (float): Longest time in seconds a message waits for
+                others to join its batch
+            executor (concurrent.futures.Executor): Where batches run
+                (defaults to the event loop's default executor)
+        """
+        if max_batch < 1:
+            raise ValueError("Batch size must be at least 1")
+        if max_delay < 0:
+            raise ValueError("Batch delay must not be negative")
+        
+        self.aes = AES(key, key_size)
+        self.max_batch = max_batch
+        self.max_batch_bytes = max_batch_bytes
+        self.max_delay = max_delay
+        self.executor = executor
+        
+        # (plaintext, iv, future) triples waiting for the next batch
+        self._pending = []
+        self._pending_bytes = 0
+        self._timer = None
+        self._tasks = set()
+        self._closed = False
+        
+        self.requests = 0
+        self.batches = 0
+        self.in_flight = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.batch_seconds = 0.0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    @property
+    def queue_depth(self):
+        """Number of messages waiting for the next batch."""
+        return len(self._pending)
+
+    async def encrypt(self, plaintext, iv):
+        """
+        Encrypt one message with AES-CBC as part of the next batch.
+        
+        Args:
+            plaintext (bytes): Data to encrypt
+            iv (bytes): 16-byte initialization vector
+        
+        Returns:
+            bytes: PKCS#7-padded ciphertext, as AES_CBC(key, iv).encrypt(plaintext)
+        """
+        if self._closed:
+            raise ValueError("Encryptor is closed")
+        if len(iv) != 16:
+            raise ValueError("IV must be 16 bytes")
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Copy now, so the caller may reuse its buffers while the message waits
+        self._pending.append((bytes(plaintext), bytes(iv), future))
+        self._pending_bytes += len(plaintext)
+        self.requests += 1
+        
+        if len(self._pending) >= self.max_batch or self._pending_bytes >= self.max_batch_bytes:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    async def aclose(self):
+        """Encrypt the messages still queued and wait for every running batch."""
+        self._closed = True
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests, batches, queue_depth (messages waiting), in_flight
+            (messages being encrypted), last, max and mean batch size, and
+            mean seconds per batch
+        """
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "mean_batch_size": (self.requests - self.queue_depth) / self.batches if self.batches else 0.0,
+            "mean_batch_seconds": self.batch_seconds / self.batches if self.batches else 0.0,
+        }
+
+    def _flush(self):
+        """Hand the queued messages to the executor as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending
+        if not batch:
+            return
+        self._pending = []
+        self._pending_bytes = 0
+        
+        self.batches += 1
+        self.in_flight += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        """Encrypt one batch in the executor and resolve its futures."""
+        messages = [plaintext for plaintext, _, _ in batch]
+        ivs = [iv for _, iv, _ in batch]
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, multi_buffer_cbc_encrypt, self.aes, messages, ivs)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.in_flight -= len(batch)
+            self.batch_seconds += time.perf_counter() - start
+        
+        # Callers that were cancelled while waiting have already given up
+        for (_, _, future), ciphertext in zip(batch, results):
+            if not future.done():
+                future.set_result(ciphertext)
+
+
+# Example usage
+if __name__ == "__main__":
+    async def demo():
+        key = os.urandom(16)
+        messages = [os.urandom(n) for n in range(1, 2001)]
+        ivs = [os.urandom(16) for _ in messages]
+        
+        async with BatchingEncryptor(key, max_delay=0.002) as encryptor:
+            start = time.time()
+            results = await asyncio.gather(*(encryptor.encrypt(m, iv) for m, iv in zip(messages, ivs)))
+            elapsed = time.time() - start
+            stats = encryptor.stats()
+        
+        for message, iv, ciphertext in zip(messages[::97], ivs[::97], results[::97]):
+            assert ciphertext == AES_CBC(key, iv).encrypt(message), "Batched encryption failed!"
+        print(f"Encrypted {len(messages)} messages in {elapsed:.3f} s, "
+              f"{stats['batches']} batches (mean {stats['mean_batch_size']:.1f}, "
+              f"max {stats['max_batch_size']})")
+    
+    asyncio.run(demo())
@@ -0,0 +1,456 @@
+
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import cpu_count
+
+if __package__:
+    from ._lazy import load_sibling, module_available
+    from .AES import AES_CBC, AES_CTR
+else:
+    from _lazy import load_sibling, module_available
+    from AES import AES_CBC, AES_CTR
+
+# Bump when backends or the calibration procedure change, so old cache files are ignored
+CALIBRATION_VERSION = 2
+
+# Payload sizes timed by calibrate(); selection uses the nearest size below the payload
+CALIBRATION_SIZES = (1 << 10, 1 << 14, 1 << 18)
+
+MODES = ("cbc", "ctr")
+DIRECTIONS = ("encrypt", "decrypt")
+
+# Seconds a calibration process may take to report (first runs include JIT
+# compilation), and then to exit, before it is given up on and terminated
+CALIBRATION_TIMEOUT = 300
+CALIBRATION_EXIT_TIMEOUT = 5
+
+
+def default_cache_path():
+    """Return the calibration cache file, under $XDG_CACHE_HOME or ~/.cache."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "aes_backends.json")
+
+
+def _sibling(module_name):
+    """Import another module of the Aes directory, as a package member if Aes is one."""
+    return importlib.import_module(f"{__package__}.{module_name}" if __package__ else module_name)
+
+
+def probe_dependencies():
+    """
+    Check which optional dependencies load on this machine.
+    
+    Returns:
+        dict: numpy, numba, multiprocessing and pycuda mapped to True/False
+    """
+    found = {}
+    for name in ("numpy", "numba"):
+        try:
+            importlib.import_module(name)
+            found[name] = True
+        except Exception:
+            found[name] = False
+    
+    try:
+        from multiprocessing import shared_memory  # noqa: F401
+        found["multiprocessing"] = True
+    except Exception:
+        found["multiprocessing"] = False
+    
+    # Importing pycuda.driver does not create a context; a usable GPU is also required
+    try:
+        import pycuda.driver as cuda
+        cuda.init()
+        found["pycuda"] = cuda.Device.count() > 0
+    except Exception:
+        found["pycuda"] = False
+    return found
+
+
+def _pure_factory(mode, key, iv, key_size):
+    if mode == "cbc":
+        return AES_CBC(key, iv, key_size)
+    return AES_CTR(key, iv, key_size, num_workers=1)
+
+
+def _bitsliced_factory(mode, key, iv, key_size):
+    if mode == "cbc":
+        return AES_CBC(key, iv, key_size, block_core="bitsliced")
+    return AES_CTR(key, iv, key_size, num_workers=1, block_core="bitsliced")
+
+
+def _multiprocessing_factory(mode, key, iv, key_size):
+    if mode == "cbc":
+        return _sibling("aes_openMP").ParallelAES_CBC(key, iv, key_size)
+    return AES_CTR(key, iv, key_size)
+
+
+def _numba_factory(mode, key, iv, key_size):
+    module = load_sibling(__package__, "aes_openMP_CTR", "aes_openMP(CTR).py")
+    if mode == "cbc":
+        return module.AES_CBC_Parallel(key, iv, key_size)
+    return module.AES_CTR_Parallel(key, iv, key_size)
+
+
+def _cuda_factory(mode, key, iv, key_size):
+    cipher = _sibling("aes_cuda").CUDA_AES_CBC(key, iv, key_size)
+    # The registry has already decided the GPU is worth it for this payload
+    cipher.gpu_threshold = 0
+    return cipher
+
+
+def _best_time(func, data, repeats):
+    """Shortest of repeats timed calls of func(data)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _time_backend(backend, mode, size):
+    """
+    Time one backend on a random payload.
+    
+    Returns:
+        tuple: (encrypt seconds, decrypt seconds), or None if the backend
+        fails or disagrees with the pure-Python reference
+    """
+    key = os.urandom(16)
+    iv = os.urandom(16)
+    data = os.urandom(size)
+    reference = _pure_factory(mode, key, iv, 128).encrypt(data)
+    
+    try:
+        cipher = backend.factory(mode, key, iv, 128)
+    except Exception:
+        return None
+    try:
+        # The first run also covers JIT compilation and pool start-up
+        if cipher.encrypt(data) != reference or cipher.decrypt(reference) != data:
+            return None
+        repeats = max(1, min(5, (1 << 16) // size))
+        return (_best_time(cipher.encrypt, data, repeats),
+                _best_time(cipher.decrypt, reference, repeats))
+    except Exception:
+        return None
+    finally:
+        if hasattr(cipher, "close"):
+            cipher.close()
+
+
+def _time_backend_sizes(backend, sizes):
+    """
+    Time one backend on every mode it implements and every size.
+    
+    Returns:
+        dict: (mode, size) mapped to the result of _time_backend()
+    """
+    return {(mode, size): _time_backend(backend, mode, size)
+            for mode in MODES if mode in backend.modes for size in sizes}
+
+
+def _calibration_worker(conn, backend, sizes):
+    """Calibration process: time one backend and send the results back."""
+    try:
+        conn.send(_time_backend_sizes(backend, sizes))
+    finally:
+        conn.close()
+
+
+class Backend:
+    """
+    One AES implementation known to the registry.
+    """
+    def __init__(self, name, modes, requires, factory):
+        """
+        Args:
+            name (str): Backend name
+            modes (tuple): Modes the backend implements ("cbc", "ctr")
+            requires (tuple): Dependencies from probe_dependencies() it needs
+            factory (callable): Called with (mode, key, iv, key_size); returns
+                an object with encrypt() and decrypt()
+        """
+        self.name = name
+        self.modes = tuple(modes)
+        self.requires = tuple(requires)
+        self.factory = factory
+
+
+class BackendRegistry:
+    """
+    Registry of AES backends with calibrated automatic selection.
+    
+    The first selection probes the optional dependencies and times every
+    usable backend on a few payload sizes, each in its own freshly spawned
+    process; each backend must also produce the same output as the
+    pure-Python implementation to be considered.
+    The results are written to a JSON cache keyed by the machine, Python
+    version and available dependencies, so later processes load them
+    instead of calibrating again.
+    """
+    def __init__(self, cache_path=None, sizes=CALIBRATION_SIZES):
+        """
+        Args:
+            cache_path (str): Calibration cache file (defaults to default_cache_path())
+            sizes (tuple): Payload sizes in bytes to calibrate
+        """
+        self.cache_path = cache_path if cache_path else default_cache_path()
+        self.sizes = tuple(sorted(sizes))
+        self.backends = OrderedDict()
+        self._dependencies = None
+        self._calibration = None
+        self._lock = threading.RLock()
+
+    def register(self, name, modes, requires=(), factory=None):
+        """
+        Add a backend. Registering changes the fingerprint, so a cached
+        calibration made without it is not reused.
+        
+        Args:
+            name (str): Backend name
+            modes (tuple): Modes the backend implements
+            requires (tuple): Dependencies it needs
+            factory (callable): Called with (mode, key, iv, key_size)
+        """
+        with self._lock:
+            self.backends[name] = Backend(name, modes, requires, factory)
+            self._calibration = None
+
+    def dependencies(self):
+        """
+        Returns:
+            dict: Result of probe_dependencies(), probed once per registry
+        """
+        with self._lock:
+            if self._dependencies is None:
+                self._dependencies = probe_dependencies()
+            return self._dependencies
+
+    def available(self, mode=None):
+        """
+        Names of backends whose dependencies are all present.
+        
+        Args:
+            mode (str): Only list backends implementing this mode
+        
+        Returns:
+            list: Backend names in registration order
+        """
+        found = self.dependencies()
+        return [b.name for b in self.backends.values()
+                if all(found.get(dep) for dep in b.requires)
+                and (mode is None or mode in b.modes)]
+
+    def fingerprint(self):
+        """
+        Describe the environment a calibration is valid for.
+        
+        Dependencies are looked up without importing them, so loading a
+        cached calibration does not pay for importing Numba or PyCUDA.
+        """
+        return {
+            "version": CALIBRATION_VERSION,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": cpu_count(),
+            "dependencies": sorted(name for name in ("numpy", "numba", "pycuda")
+                                   if module_available(name)),
+            "backends": list(self.backends),
+            "sizes": list(self.sizes),
+        }
+
+    def calibration(self):
+        """
+        Return the calibration, loading it from disk or running calibrate().
+        
+        Returns:
+            dict: {"fingerprint": ..., "timings": {"mode/direction": {size: {backend: seconds}}}}
+        """
+        with self._lock:
+            if self._calibration is None:
+                cached = self._load()
+                self._calibration = cached if cached is not None else self.calibrate()
+            return self._calibration
+
+    def calibrate(self):
+        """
+        Time every available backend and save the results.
+        
+        Each backend runs in a new interpreter started with "spawn". A
+        backend's threads (Numba's parallel kernels start a thread pool) are
+        then never alive in a process that another backend forks its worker
+        pool from, and none of them is left behind in this process, which
+        could otherwise hang at exit.
+        
+        Returns:
+            dict: The new calibration
+        """
+        with self._lock:
+            timings = {f"{mode}/{direction}": {} for mode in MODES for direction in DIRECTIONS}
+            for name in self.available():
+                results = self._time_isolated(self.backends[name])
+                for (mode, size), result in results.items():
+                    if result is None:
+                        continue
+                    for direction, seconds in zip(DIRECTIONS, result):
+                        timings[f"{mode}/{direction}"].setdefault(str(size), {})[name] = seconds
+            
+            self._calibration = {"fingerprint": self.fingerprint(), "timings": timings}
+            self._save(self._calibration)
+            return self._calibration
+
+    def select(self, mode, direction="encrypt", size=0):
+        """
+        Pick the fastest backend for a payload.
+        
+        Args:
+            mode (str): "cbc" or "ctr"
+            direction (str): "encrypt" or "decrypt"
+            size (int): Payload size in bytes
+        
+        Returns:
+            str: Backend name
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode must be one of {', '.join(MODES)}")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Direction must be one of {', '.join(DIRECTIONS)}")
+        
+        by_size = self.calibration()["timings"].get(f"{mode}/{direction}", {})
+        calibrated = [s for s in self.sizes if by_size.get(str(s))]
+        if not calibrated:
+            return "pure"
+        # Largest calibrated size not above the payload, else the smallest
+        bucket = max([s for s in calibrated if s <= size] or [calibrated[0]])
+        times = by_size[str(bucket)]
+        return min(times, key=times.get)
+
+    def create(self, mode, key, iv, key_size=128, size=0, direction="encrypt", backend=None):
+        """
+        Create a cipher from the selected (or the named) backend.
+        
+        Args:
+            mode (str): "cbc" or "ctr"
+            key (bytes): Encryption/decryption key
+            iv (bytes): 16-byte IV or initial counter block
+            key_size (int): Key size in bits, can be 128, 192, or 256
+            size (int): Expected payload size in bytes
+            direction (str): "encrypt" or "decrypt"
+            backend (str): Backend name, bypassing selection
+        
+        Returns:
+            An object with encrypt() and decrypt()
+        """
+        name = backend if backend else self.select(mode, direction, size)
+        if name not in self.backends:
+            raise ValueError(f"Unknown backend: {name}")
+        if mode not in self.backends[name].modes:
+            raise ValueError(f"Backend {name} does not implement {mode}")
+        return self.backends[name].factory(mode, key, iv, key_size)
+
+    def _time_isolated(self, backend):
+        """
+        Time one backend in a new spawned process.
+        
+        As with any "spawn" process, the main module is imported again in the
+        child, so scripts must guard their entry point with
+        if __name__ == "__main__". A backend whose factory cannot be pickled
+        (a lambda, say) is timed in this process instead.
+        
+        Returns:
+            dict: (mode, size) mapped to (encrypt seconds, decrypt seconds) or
+            None; empty if the process died or timed out before reporting
+        """
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_calibration_worker, args=(sender, backend, self.sizes))
+        try:
+            # The process object is pickled before anything is started
+            process.start()
+        except (pickle.PicklingError, AttributeError, TypeError):
+            receiver.close()
+            sender.close()
+            return _time_backend_sizes(backend, self.sizes)
+        sender.close()
+        
+        try:
+            if receiver.poll(CALIBRATION_TIMEOUT):
+                return receiver.recv()
+            return {}
+        except EOFError:
+            return {}
+        finally:
+            receiver.close()
+            process.join(CALIBRATION_EXIT_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    def _load(self):
+        """Read the cache file, returning None if it is missing or stale."""
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get("fingerprint") != self.fingerprint():
+            return None
+        return cached
+
+    def _save(self, calibration):
+        """Write the cache file atomically; an unwritable cache is not an error."""
+        directory = os.path.dirname(self.cache_path)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(calibration, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+# Process-wide registry with the bundled backends
+registry = BackendRegistry()
+registry.register("pure", MODES, (), _pure_factory)
+registry.register("bitsliced", MODES, ("numpy",), _bitsliced_factory)
+registry.register("multiprocessing", MODES, ("multiprocessing",), _multiprocessing_factory)
+registry.register("numba", MODES, ("numpy", "numba"), _numba_factory)
+registry.register("cuda", ("cbc",), ("numpy", "pycuda"), _cuda_factory)
+
+
+def create_cipher(mode, key, iv, key_size=128, size=0, direction="encrypt", backend=None):
+    """Create a cipher with the process-wide registry (see BackendRegistry.create)."""
+    return registry.create(mode, key, iv, key_size, size, direction, backend)
+
+
+if __name__ == "__main__":
+    recalibrate = "--recalibrate" in sys.argv[1:]
+    
+    print("Dependencies:", ", ".join(f"{name}={'yes' if ok else 'no'}"
+                                     for name, ok in registry.dependencies().items()))
+    print("Available backends:", ", ".join(registry.available()))
+    
+    start = time.time()
+    calibration = registry.calibrate() if recalibrate else registry.calibration()
+    print(f"Calibration ready in {time.time() - start:.3f} s (cache: {registry.cache_path})")
+    
+    for target, by_size in calibration["timings"].items():
+        for size, times in by_size.items():
+            ranked = sorted(times.items(), key=lambda item: item[1])
+            row = ", ".join(f"{name} {int(size) / seconds / 1e6:.2f} MB/s" for name, seconds in ranked)
+            print(f"{target:12} {int(size):>8} B: {row}")
@@ -0,0 +1,263 @@
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+if __package__:
+    from .AES import AES_CBC, ctr_keystream, unpad_pkcs7, xor_bytes
+    from .aes_file import read_key_file
+else:
+    from AES import AES_CBC, ctr_keystream, unpad_pkcs7, xor_bytes
+    from aes_file import read_key_file
+
+# Default bytes per pipeline chunk
+CHUNK_SIZE = 1 << 20
+
+# Per-process (AES_CBC, counter) pair, set once by _init_worker when the pool starts
+_worker_state = None
+
+
+def _init_worker(key, key_size, iv):
+    """Pool initializer: expand the key once per worker process."""
+    global _worker_state
+    _worker_state = (AES_CBC(key, iv, key_size), int.from_bytes(iv, 'big'))
+
+
+def _crypt_chunk(mode, position, chunk, last, cbc=None, counter=None):
+    """
+    Encrypt or decrypt one independent chunk.
+    
+    For CTR, position is the index of the chunk's first block; for CBC
+    decryption it is the ciphertext block preceding the chunk. The last
+    CBC chunk has its padding removed.
+    """
+    if cbc is None:
+        cbc, counter = _worker_state
+    if mode == "ctr":
+        keystream = ctr_keystream(cbc.aes, counter, position, (len(chunk) + 15) // 16)
+        return xor_bytes(chunk, keystream[:len(chunk)])
+    plaintext = cbc._decrypt_chain(chunk, position)
+    return unpad_pkcs7(plaintext) if last else plaintext
+
+
+def _crypt_chunk_worker(args):
+    """Pool task: process one chunk with the worker's cipher."""
+    return _crypt_chunk(*args)
+
+
+def _read_exact(src, size):
+    """Read size bytes, looping over short reads; fewer only at end of stream."""
+    data = b""
+    while len(data) < size:
+        chunk = src.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class StreamPipeline:
+    """
+    Reader -> cipher -> writer pipeline between two binary streams.
+    
+    A reader thread fills a bounded queue with fixed-size chunks while the
+    previous ones are being encrypted, and a writer thread drains results
+    in order, so I/O overlaps with the cipher work. Chunks that do not
+    depend on each other (CTR, CBC decryption) go to a process pool with
+    a bounded number in flight; CBC encryption is chained and runs in the
+    dispatching thread.
+    """
+    def __init__(self, key, iv, mode="ctr", key_size=128, num_workers=None,
+                 chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            key (bytes): Encryption/decryption key
+            iv (bytes): 16-byte IV (CBC) or initial counter block (CTR)
+            mode (str): "cbc" or "ctr"
+            key_size (int): Key size in bits, can be 128, 192, or 256
+            num_workers (int): Number of cipher worker processes (defaults to CPU count)
+            chunk_size (int): Bytes per chunk, a multiple of 16
+        """
+        if mode not in ("cbc", "ctr"):
+            raise ValueError("Mode must be cbc or ctr")
+        if chunk_size <= 0 or chunk_size % 16:
+            raise ValueError("Chunk size must be a positive multiple of 16 bytes")
+        
+        self.cbc = AES_CBC(key, iv, key_size)
+        self.counter = int.from_bytes(iv, 'big')
+        self.mode = mode
+        self.num_workers = num_workers if num_workers else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        # Chunks allowed in each queue, bounding memory to a few chunks per worker
+        self.depth = 2 * self.num_workers
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def run(self, src, dst, decrypt=False):
+        """
+        Stream src through the cipher into dst.
+        
+        Args:
+            src: Binary stream to read from
+            dst: Binary stream to write to
+            decrypt (bool): Decrypt instead of encrypt
+        """
+        pool = None
+        if self.num_workers > 1 and (decrypt or self.mode == "ctr"):
+            from multiprocessing import Pool
+            
+            # Start the pool before the threads so no thread is running at fork time
+            pool = Pool(self.num_workers, initializer=_init_worker,
+                        initargs=(self.cbc.aes.key, self.cbc.aes.key_size, self.cbc.iv))
+        
+        chunks = queue.Queue(self.depth)
+        results = queue.Queue(self.depth)
+        errors = []
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read, args=(src, chunks, errors, stop), daemon=True)
+        writer = threading.Thread(target=self._write, args=(dst, results, errors), daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            self._dispatch(chunks, results, pool, decrypt)
+        except BaseException as e:
+            errors.append(e)
+            # Let the writer finish and tell the reader to give up. The reader
+            # is not joined: it may be blocked in src.read on a stream that
+            # stays open, and as a daemon it cannot keep the process alive
+            results.put(None)
+            stop.set()
+        finally:
+            writer.join()
+            if pool is not None:
+                pool.terminate()
+        
+        if errors:
+            raise errors[0]
+
+    def _read(self, src, chunks, errors, stop):
+        """
+        Reader stage: queue (chunk, is_last) pairs, reading one chunk ahead.
+        
+        Chunks are filled across short reads (pipes, sockets and ttys return
+        whatever is available), so only the last one can be short.
+        """
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        try:
+            pending = _read_exact(src, self.chunk_size)
+            while True:
+                chunk = _read_exact(src, self.chunk_size) if len(pending) == self.chunk_size else b""
+                self.bytes_in += len(pending)
+                if not put((pending, not chunk)) or not chunk:
+                    return
+                pending = chunk
+        except BaseException as e:
+            errors.append(e)
+            put(None)
+
+    def _dispatch(self, chunks, results, pool, decrypt):
+        """Cipher stage: hand each chunk to the pool, or process it here."""
+        encryptor = self.cbc.encryptor() if self.mode == "cbc" and not decrypt else None
+        position = self.cbc.iv if self.mode == "cbc" else 0
+        
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            chunk, last = item
+            
+            if encryptor is not None:
+                output = encryptor.update(chunk)
+                results.put(output + encryptor.finalize() if last else output)
+            else:
+                if self.mode == "cbc" and len(chunk) % 16:
+                    raise ValueError("Ciphertext length must be a multiple of 16 bytes")
+                if self.mode == "cbc" and not chunk:
+                    raise ValueError("Ciphertext is empty")
+                args = (self.mode, position, chunk, last)
+                if pool is not None:
+                    results.put(pool.apply_async(_crypt_chunk_worker, (args,)))
+                else:
+                    results.put(_crypt_chunk(*args, cbc=self.cbc, counter=self.counter))
+                position = chunk[-16:] if self.mode == "cbc" else position + len(chunk) // 16
+            
+            if last:
+                break
+        results.put(None)
+
+    def _write(self, dst, results, errors):
+        """Writer stage: write results in chunk order."""
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                data = item if isinstance(item, bytes) else item.get()
+                dst.write(data)
+                self.bytes_out += len(data)
+            dst.flush()
+        except BaseException as e:
+            errors.append(e)
+            # Keep draining so the dispatcher never blocks on a full queue
+            while results.get() is not None:
+                pass
+
+
+def main(argv=None):
+    """Command-line entry point: stream stdin to stdout through AES."""
+    parser = argparse.ArgumentParser(
+        prog="aes", description="Encrypt or decrypt stdin to stdout with AES")
+    parser.add_argument("command", choices=("encrypt", "decrypt"))
+    parser.add_argument("-k", "--key-file", required=True,
+                        help="file holding the raw or hex-encoded key")
+    parser.add_argument("-m", "--mode", choices=("cbc", "ctr"), default="ctr")
+    parser.add_argument("--iv", help="hex IV; by default a random IV is written before "
+                                     "the ciphertext and read back on decryption")
+    parser.add_argument("-w", "--workers", type=int, help="cipher worker processes "
+                                                          "(default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="bytes per pipeline chunk (multiple of 16)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    args = parser.parse_args(argv)
+    
+    src = sys.stdin.buffer
+    dst = sys.stdout.buffer
+    decrypt = args.command == "decrypt"
+    try:
+        key, key_size = read_key_file(args.key_file)
+        if args.iv is not None:
+            iv = bytes.fromhex(args.iv)
+        elif decrypt:
+            iv = src.read(16)
+        else:
+            iv = os.urandom(16)
+            dst.write(iv)
+        if len(iv) != 16:
+            raise ValueError("IV must be 16 bytes")
+        
+        pipeline = StreamPipeline(key, iv, args.mode, key_size, args.workers, args.chunk_size)
+        start = time.time()
+        pipeline.run(src, dst, decrypt)
+        elapsed = time.time() - start
+    except ValueError as e:
+        parser.exit(1, f"aes: error: {e}\n")
+    
+    if not args.quiet:
+        rate = pipeline.bytes_in / elapsed / 1e6 if elapsed > 0 else 0.0
+        print(f"aes: {args.command}ed {pipeline.bytes_in} bytes in {elapsed:.3f} s "
+              f"({rate:.2f} MB/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
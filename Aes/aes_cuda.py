@@ -6,17 +6,36 @@ import os
 import numpy as np
 
 # Import original AES implementation for CPU fallback and key expansion
-from AES import AES, pad_pkcs7, unpad_pkcs7
+if __package__:
+    from .AES import AES, AES_CBC, pad_pkcs7, unpad_pkcs7
+else:
+    from AES import AES, AES_CBC, pad_pkcs7, unpad_pkcs7
 
-# PyCUDA imports
-try:
-    import pycuda.driver as cuda
-    import pycuda.autoinit
-    from pycuda.compiler import SourceModule
-    CUDA_AVAILABLE = True
-except ImportError:
-    CUDA_AVAILABLE = False
-    print("PyCUDA not available. Falling back to CPU implementation.")
+# PyCUDA is imported by load_pycuda() when the first CUDA_AES_CBC is created,
+# since pycuda.autoinit creates a driver context; None means not tried yet
+cuda = None
+SourceModule = None
+CUDA_AVAILABLE = None
+
+
+def load_pycuda():
+    """
+    Import PyCUDA and create a driver context, once per process.
+    
+    Returns:
+        bool: True if PyCUDA is available
+    """
+    global cuda, SourceModule, CUDA_AVAILABLE
+    if CUDA_AVAILABLE is None:
+        try:
+            import pycuda.driver as cuda
+            import pycuda.autoinit  # noqa: F401
+            from pycuda.compiler import SourceModule
+            CUDA_AVAILABLE = True
+        except ImportError:
+            CUDA_AVAILABLE = False
+            print("PyCUDA not available. Falling back to CPU implementation.")
+    return CUDA_AVAILABLE
 
 # CUDA kernel for AES encryption
 CUDA_AES_KERNEL = """
@@ -113,6 +132,11 @@ class CUDA_AES_CBC:
     """
     AES in Cipher Block Chaining (CBC) mode accelerated with CUDA.
     """
+    # Inputs with fewer blocks than this use the CPU implementation; the
+    # backend registry (aes_backends) sets it to 0 once calibration has
+    # chosen the GPU for a payload size
+    gpu_threshold = 100
+
     def __init__(self, key, iv, key_size=128):
         """
         Initialize CUDA-accelerated AES-CBC.
@@ -125,14 +149,16 @@ class CUDA_AES_CBC:
         if len(iv) != 16:
             raise ValueError("IV must be 16 bytes")
         
-        # Create CPU-based AES for key expansion and small data fallback
-        self.aes = AES(key, key_size)
+        # Create CPU-based AES-CBC for key expansion and small data fallback;
+        # the key schedule comes from the process-wide cache
+        self.cpu_cbc = AES_CBC(key, iv, key_size)
+        self.aes = self.cpu_cbc.aes
         self.iv = iv
         self.key_size = key_size
         self.rounds = {128: 10, 192: 12, 256: 14}[key_size]
         
         # Initialize CUDA if available
-        if CUDA_AVAILABLE:
+        if load_pycuda():
             self.module = SourceModule(CUDA_AES_KERNEL)
             self.encrypt_kernel = self.module.get_function("aes_cbc_encrypt_kernel")
             self.decrypt_kernel = self.module.get_function("aes_cbc_decrypt_kernel")
@@ -179,10 +205,9 @@ class CUDA_AES_CBC:
         num_blocks = len(padded_plaintext) // 16
         
         # For small data or if CUDA is not available, use CPU implementation
-        if not CUDA_AVAILABLE or num_blocks < 100:
+        if not CUDA_AVAILABLE or num_blocks < self.gpu_threshold:
             # Fall back to CPU implementation
-            standard_aes = AES_CBC(self.aes.key, self.iv, self.key_size)
-            return standard_aes.encrypt(plaintext)
+            return self.cpu_cbc.encrypt(plaintext)
         
         # Prepare data for GPU
         h_plaintext = np.frombuffer(padded_plaintext, dtype=np.uint8)
@@ -231,10 +256,9 @@ class CUDA_AES_CBC:
         num_blocks = len(ciphertext) // 16
         
         # For small data or if CUDA is not available, use CPU implementation
-        if not CUDA_AVAILABLE or num_blocks < 100:
+        if not CUDA_AVAILABLE or num_blocks < self.gpu_threshold:
             # Fall back to CPU implementation
-            standard_aes = AES_CBC(self.aes.key, self.iv, self.key_size)
-            return standard_aes.decrypt(ciphertext)
+            return self.cpu_cbc.decrypt(ciphertext)
         
         # Prepare data for GPU
         h_ciphertext = np.frombuffer(ciphertext, dtype=np.uint8)
@@ -288,7 +312,7 @@ if __name__ == "__main__":
     print(f"Standard implementation time: {standard_time:.4f} seconds")
     
     # CUDA implementation
-    if CUDA_AVAILABLE:
+    if load_pycuda():
         start_time = time.time()
         aes_cuda = CUDA_AES_CBC(key, iv)
         ciphertext_cuda = aes_cuda.encrypt(plaintext)
@@ -0,0 +1,273 @@
+
+import argparse
+import mmap
+import os
+import sys
+
+if __package__:
+    from .AES import AES, AES_CTR, _ctr_xor_range, ctr_keystream, xor_bytes
+else:
+    from AES import AES, AES_CTR, _ctr_xor_range, ctr_keystream, xor_bytes
+
+# Encrypted files start with the 16-byte initial counter block
+HEADER_SIZE = 16
+
+# Blocks processed per step, bounding the keystream buffer to 1 MiB
+CHUNK_BLOCKS = 65536
+
+
+def read_key_file(path):
+    """
+    Read an AES key from a file.
+    
+    The file holds either the raw 16, 24 or 32 key bytes, or the key as
+    hex text (surrounding whitespace is ignored).
+    
+    Args:
+        path (str): Path of the key file
+    
+    Returns:
+        tuple: (key bytes, key size in bits)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    
+    if len(data) not in (16, 24, 32):
+        try:
+            data = bytes.fromhex(data.decode("ascii").strip())
+        except ValueError:
+            raise ValueError("Key file must hold 16, 24 or 32 raw bytes or their hex encoding")
+    if len(data) not in (16, 24, 32):
+        raise ValueError("Key must be 16, 24 or 32 bytes")
+    return data, 8 * len(data)
+
+
+# Per-process AES, set once by _init_worker when the pool starts
+_worker_aes = None
+
+
+def _init_worker(key, key_size):
+    """Pool initializer: expand the key once per worker process."""
+    global _worker_aes
+    _worker_aes = AES(key, key_size)
+
+
+def _ctr_xor_mapped(aes, counter, src, dst, start, end, length):
+    """XOR blocks [start, end) of src into dst one CHUNK_BLOCKS step at a time."""
+    for lo in range(start, end, CHUNK_BLOCKS):
+        _ctr_xor_range(aes, counter, src, dst, lo, min(lo + CHUNK_BLOCKS, end), length)
+
+
+def _ctr_file_worker(args):
+    """
+    Pool task: map both files and process one block range.
+    
+    src_offset and dst_offset are where the payload starts in each file, so
+    the same task serves encryption (header on dst) and decryption (header
+    on src).
+    """
+    src_path, src_offset, dst_path, dst_offset, counter, start, end, length = args
+    with open(src_path, "rb") as fsrc, open(dst_path, "r+b") as fdst:
+        src_map = mmap.mmap(fsrc.fileno(), 0, access=mmap.ACCESS_READ)
+        dst_map = mmap.mmap(fdst.fileno(), 0)
+        src = memoryview(src_map)[src_offset:src_offset + length]
+        dst = memoryview(dst_map)[dst_offset:dst_offset + length]
+        try:
+            _ctr_xor_mapped(_worker_aes, counter, src, dst, start, end, length)
+        finally:
+            src.release()
+            dst.release()
+            src_map.close()
+            dst_map.close()
+
+
+class CTRFile:
+    """
+    Seekable AES-CTR encryption of files.
+    
+    An encrypted file is the 16-byte initial counter block followed by the
+    ciphertext. The counter for any byte offset is computed directly, so
+    decrypt_range() reads and decrypts only the blocks covering the
+    requested bytes, and full-file runs split the file into block ranges
+    that worker processes encrypt straight into the memory-mapped output.
+    
+    The worker pool is started by the first large file and kept for the
+    lifetime of the object. Call close() or use the object as a context
+    manager to shut the pool down.
+    """
+    def __init__(self, key, key_size=128, num_workers=None):
+        """
+        Args:
+            key (bytes): Encryption/decryption key
+            key_size (int): Key size in bits, can be 128, 192, or 256
+            num_workers (int): Number of worker processes (defaults to CPU count)
+        """
+        self.aes = AES(key, key_size)
+        self.num_workers = num_workers if num_workers else os.cpu_count() or 1
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self):
+        """Return the worker pool, starting it on first use."""
+        if self._pool is None:
+            from multiprocessing import Pool
+            self._pool = Pool(processes=self.num_workers, initializer=_init_worker,
+                              initargs=(self.aes.key, self.aes.key_size))
+        return self._pool
+
+    def encrypt_file(self, src_path, dst_path, iv=None):
+        """
+        Encrypt a file.
+        
+        Args:
+            src_path (str): Plaintext file
+            dst_path (str): Output file, created or overwritten
+            iv (bytes): 16-byte initial counter block (random by default)
+        """
+        if iv is None:
+            iv = os.urandom(16)
+        if len(iv) != 16:
+            raise ValueError("IV must be 16 bytes")
+        
+        length = os.path.getsize(src_path)
+        self._run(src_path, 0, dst_path, HEADER_SIZE, length, iv)
+
+    def decrypt_file(self, src_path, dst_path):
+        """
+        Decrypt a file written by encrypt_file().
+        
+        Args:
+            src_path (str): Encrypted file
+            dst_path (str): Output file, created or overwritten
+        """
+        iv = self._read_header(src_path)
+        length = os.path.getsize(src_path) - HEADER_SIZE
+        self._run(src_path, HEADER_SIZE, dst_path, 0, length, iv)
+
+    def decrypt_range(self, path, start, length):
+        """
+        Decrypt part of an encrypted file.
+        
+        Args:
+            path (str): Encrypted file
+            start (int): Offset of the first plaintext byte
+            length (int): Number of bytes; the range is cut off at the end of the file
+        
+        Returns:
+            bytes: Plaintext bytes [start, start + length)
+        """
+        if start < 0 or length < 0:
+            raise ValueError("Start and length must not be negative")
+        
+        with open(path, "rb") as f:
+            iv = f.read(HEADER_SIZE)
+            if len(iv) != HEADER_SIZE:
+                raise ValueError("File is too short to hold the CTR header")
+            total = os.fstat(f.fileno()).st_size - HEADER_SIZE
+            end = min(start + length, total)
+            if end <= start:
+                return b""
+            
+            first = start // 16
+            last = (end + 15) // 16
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                ciphertext = mapped[HEADER_SIZE + 16 * first:HEADER_SIZE + min(16 * last, total)]
+        
+        keystream = ctr_keystream(self.aes, int.from_bytes(iv, 'big'), first, last - first)
+        plaintext = xor_bytes(ciphertext, keystream[:len(ciphertext)])
+        skip = start - 16 * first
+        return plaintext[skip:skip + end - start]
+
+    def _read_header(self, path):
+        """Return the initial counter block stored at the start of an encrypted file."""
+        with open(path, "rb") as f:
+            iv = f.read(HEADER_SIZE)
+        if len(iv) != HEADER_SIZE:
+            raise ValueError("File is too short to hold the CTR header")
+        return iv
+
+    def _run(self, src_path, src_offset, dst_path, dst_offset, length, iv):
+        """
+        XOR length payload bytes of src into a new dst with the keystream.
+        
+        The output is sized up front (with the header when dst_offset is
+        non-zero) and memory-mapped, then either processed in this process
+        or split into one block range per worker.
+        """
+        counter = int.from_bytes(iv, 'big')
+        
+        with open(dst_path, "wb") as f:
+            if dst_offset:
+                f.write(iv)
+            f.truncate(dst_offset + length)
+        if not length:
+            return
+        
+        num_blocks = (length + 15) // 16
+        if self.num_workers <= 1 or num_blocks < AES_CTR.parallel_threshold:
+            with open(src_path, "rb") as fsrc, open(dst_path, "r+b") as fdst:
+                with mmap.mmap(fsrc.fileno(), 0, access=mmap.ACCESS_READ) as src_map, \
+                        mmap.mmap(fdst.fileno(), 0) as dst_map:
+                    src = memoryview(src_map)[src_offset:src_offset + length]
+                    dst = memoryview(dst_map)[dst_offset:dst_offset + length]
+                    try:
+                        _ctr_xor_mapped(self.aes, counter, src, dst, 0, num_blocks, length)
+                    finally:
+                        src.release()
+                        dst.release()
+            return
+        
+        per_worker = -(-num_blocks // self.num_workers)
+        tasks = [(src_path, src_offset, dst_path, dst_offset, counter, start,
+                  min(start + per_worker, num_blocks), length)
+                 for start in range(0, num_blocks, per_worker)]
+        self._get_pool().map(_ctr_file_worker, tasks)
+
+
+def main(argv=None):
+    """Command-line entry point: encrypt, decrypt or decrypt a byte range of a file."""
+    parser = argparse.ArgumentParser(description="Seekable AES-CTR file encryption")
+    parser.add_argument("command", choices=("encrypt", "decrypt", "range"))
+    parser.add_argument("key_file", help="file holding the raw or hex-encoded key")
+    parser.add_argument("src", help="input file")
+    parser.add_argument("dst", nargs="?", help="output file (range writes to stdout)")
+    parser.add_argument("--start", type=int, default=0, help="first plaintext byte for range")
+    parser.add_argument("--length", type=int, help="number of bytes for range (default: to the end)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    
+    key, key_size = read_key_file(args.key_file)
+    
+    if args.command == "range":
+        length = args.length if args.length is not None else os.path.getsize(args.src)
+        data = CTRFile(key, key_size, args.workers).decrypt_range(args.src, args.start, length)
+        if args.dst:
+            with open(args.dst, "wb") as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+        return
+    
+    if not args.dst:
+        parser.error(f"{args.command} needs an output file")
+    with CTRFile(key, key_size, args.workers) as ctr_file:
+        if args.command == "encrypt":
+            ctr_file.encrypt_file(args.src, args.dst)
+        else:
+            ctr_file.decrypt_file(args.src, args.dst)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,44 +5,239 @@ AES implementation with OpenMP parallelization for improved performance.
 import numpy as np
 from numba import jit, prange
 import os
-from AES import AES, AES_CBC, pad_pkcs7, unpad_pkcs7
+import sys
+
+# Numba's on-disk cache records the name of the module its kernels were
+# compiled in. _lazy.load_sibling always loads this file as aes_openMP_CTR,
+# so register that name too when it is run directly; kernels cached by
+# either route then load from both.
+sys.modules.setdefault("aes_openMP_CTR", sys.modules[__name__])
+
+if __package__:
+    from .AES import AES, AES_CBC, multi_buffer_cbc_encrypt, pad_pkcs7, unpad_pkcs7
+else:
+    from AES import AES, AES_CBC, multi_buffer_cbc_encrypt, pad_pkcs7, unpad_pkcs7
 # Import the base AES implementation from the previous code
 # AES, pad_pkcs7, unpad_pkcs7 classes and functions remain the same
 
+# S-boxes as uint8 arrays; Numba freezes module-level arrays into the kernels
+SBOX = np.array(AES.sbox, dtype=np.uint8)
+INV_SBOX = np.array(AES.inv_sbox, dtype=np.uint8)
+
+
+def flatten_round_keys(aes_obj):
+    """
+    Flatten the round keys of an AES object for the Numba kernels.
+    
+    Args:
+        aes_obj: AES object
+        
+    Returns:
+        numpy.ndarray: uint8 array of 16 * (rounds + 1) round key bytes
+    """
+    return np.ascontiguousarray(aes_obj._get_np_round_keys().reshape(-1))
+
+
+@jit(nopython=True, cache=True)
+def _xtime(a):
+    """Multiply a byte by x in GF(2^8)."""
+    a <<= 1
+    if a & 0x100:
+        a ^= 0x11B
+    return a
+
+
+@jit(nopython=True, cache=True)
+def _mix_column(state, c):
+    """MixColumns on column c of a 16-byte state array, in place."""
+    a0 = np.int32(state[4*c])
+    a1 = np.int32(state[4*c + 1])
+    a2 = np.int32(state[4*c + 2])
+    a3 = np.int32(state[4*c + 3])
+    total = a0 ^ a1 ^ a2 ^ a3
+    state[4*c] = a0 ^ total ^ _xtime(a0 ^ a1)
+    state[4*c + 1] = a1 ^ total ^ _xtime(a1 ^ a2)
+    state[4*c + 2] = a2 ^ total ^ _xtime(a2 ^ a3)
+    state[4*c + 3] = a3 ^ total ^ _xtime(a3 ^ a0)
+
+
+@jit(nopython=True, cache=True)
+def _encrypt_block(src, dst, round_keys, rounds):
+    """Encrypt one 16-byte block from src into dst."""
+    state = np.empty(16, dtype=np.uint8)
+    shifted = np.empty(16, dtype=np.uint8)
+    for i in range(16):
+        state[i] = src[i] ^ round_keys[i]
+    
+    for r in range(1, rounds + 1):
+        # SubBytes + ShiftRows: row `row` of column c comes from column c + row
+        for c in range(4):
+            for row in range(4):
+                shifted[4*c + row] = SBOX[state[4*((c + row) & 3) + row]]
+        if r < rounds:
+            for c in range(4):
+                _mix_column(shifted, c)
+        for i in range(16):
+            state[i] = shifted[i] ^ round_keys[16*r + i]
+    
+    for i in range(16):
+        dst[i] = state[i]
+
+
+@jit(nopython=True, cache=True)
+def _decrypt_block(src, dst, round_keys, rounds):
+    """Decrypt one 16-byte block from src into dst."""
+    state = np.empty(16, dtype=np.uint8)
+    shifted = np.empty(16, dtype=np.uint8)
+    for i in range(16):
+        state[i] = src[i] ^ round_keys[16*rounds + i]
+    
+    for r in range(rounds - 1, -1, -1):
+        # InvShiftRows + InvSubBytes: row `row` of column c comes from column c - row
+        for c in range(4):
+            for row in range(4):
+                shifted[4*c + row] = INV_SBOX[state[4*((c - row) & 3) + row]] ^ round_keys[16*r + 4*c + row]
+        if r > 0:
+            # InvMixColumns as a pre-multiplication followed by MixColumns
+            for c in range(4):
+                u = _xtime(_xtime(np.int32(shifted[4*c]) ^ np.int32(shifted[4*c + 2])))
+                v = _xtime(_xtime(np.int32(shifted[4*c + 1]) ^ np.int32(shifted[4*c + 3])))
+                shifted[4*c] ^= u
+                shifted[4*c + 1] ^= v
+                shifted[4*c + 2] ^= u
+                shifted[4*c + 3] ^= v
+                _mix_column(shifted, c)
+        for i in range(16):
+            state[i] = shifted[i]
+    
+    for i in range(16):
+        dst[i] = state[i]
+
+
 # Parallelize the encryption of multiple blocks using Numba and OpenMP
-@jit(nopython=True, parallel=True)
-def parallel_encrypt_blocks(aes_obj, blocks, iv):
+@jit(nopython=True, parallel=True, cache=True)
+def parallel_encrypt_blocks(blocks, round_keys, rounds):
     """
     Encrypt multiple blocks in parallel using OpenMP via Numba.
     This function handles the ECB (Electronic Codebook) part of encryption.
     
     Args:
-        aes_obj: AES object with encryption methods
-        blocks: List of blocks to encrypt
-        iv: Initialization vector for CBC mode
+        blocks: (N, 16) uint8 array of blocks to encrypt
+        round_keys: Flattened uint8 round keys (see flatten_round_keys)
+        rounds: Number of AES rounds
         
     Returns:
-        List of encrypted blocks
+        (N, 16) uint8 array of encrypted blocks
+    """
+    result = np.empty((blocks.shape[0], 16), dtype=np.uint8)
+    for i in prange(blocks.shape[0]):
+        _encrypt_block(blocks[i], result[i], round_keys, rounds)
+    return result
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def parallel_decrypt_blocks(blocks, round_keys, rounds):
     """
-    # For ECB mode, we can parallelize directly
-    result = np.zeros((len(blocks), 16), dtype=np.uint8)
+    Decrypt multiple blocks in parallel using OpenMP via Numba.
     
-    for i in prange(len(blocks)):
-        block = blocks[i]
-        # Convert block to state matrix
-        state = [list(block[j:j+4]) for j in range(0, 16, 4)]
-        state = [list(row) for row in zip(*state)]  # Transpose
-        
-        # Apply encryption rounds
-        # (This is a simplified version - you'll need to implement the actual AES rounds here)
-        # ...
+    Args:
+        blocks: (N, 16) uint8 array of blocks to decrypt
+        round_keys: Flattened uint8 round keys (see flatten_round_keys)
+        rounds: Number of AES rounds
         
-        # Convert state matrix back to bytes
-        state = [list(row) for row in zip(*state)]  # Transpose back
-        result[i] = np.array(sum(state, []), dtype=np.uint8)
+    Returns:
+        (N, 16) uint8 array of decrypted blocks
+    """
+    result = np.empty((blocks.shape[0], 16), dtype=np.uint8)
+    for i in prange(blocks.shape[0]):
+        _decrypt_block(blocks[i], result[i], round_keys, rounds)
+    return result
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def parallel_ctr_keystream(counter, first_block, num_blocks, round_keys, rounds):
+    """
+    Generate CTR keystream blocks in parallel using OpenMP via Numba.
+    
+    Block i of the keystream is the encryption of the 16-byte initial
+    counter block plus (first_block + i), taken as a 128-bit big-endian
+    integer.
     
+    Args:
+        counter: 16-byte uint8 initial counter block
+        first_block: Index of the first keystream block to generate
+        num_blocks: Number of keystream blocks to generate
+        round_keys: Flattened uint8 round keys (see flatten_round_keys)
+        rounds: Number of AES rounds
+        
+    Returns:
+        (num_blocks, 16) uint8 array of keystream blocks
+    """
+    result = np.empty((num_blocks, 16), dtype=np.uint8)
+    for i in prange(num_blocks):
+        block = np.empty(16, dtype=np.uint8)
+        carry = np.int64(first_block + i)
+        for j in range(15, -1, -1):
+            v = np.int64(counter[j]) + (carry & 0xFF)
+            block[j] = v & 0xFF
+            carry = (carry >> 8) + (v >> 8)
+        _encrypt_block(block, result[i], round_keys, rounds)
     return result
 
+
+class AES_CTR_Parallel:
+    """
+    AES in Counter (CTR) mode with the keystream generated in parallel.
+    """
+    def __init__(self, key, iv, key_size=128):
+        """
+        Initialize AES-CTR with key and initial counter block.
+        
+        Args:
+            key (bytes): Encryption/decryption key
+            iv (bytes): 16-byte initial counter block
+            key_size (int): Key size in bits, can be 128, 192, or 256
+        """
+        if len(iv) != 16:
+            raise ValueError("IV must be 16 bytes")
+        
+        self.aes = AES(key, key_size)
+        self.iv = iv
+        self.round_keys = flatten_round_keys(self.aes)
+        self.counter = np.frombuffer(iv, dtype=np.uint8)
+
+    def encrypt(self, plaintext):
+        """
+        Encrypt data using parallel AES-CTR. No padding is applied, so the
+        ciphertext has the same length as the plaintext.
+        
+        Args:
+            plaintext (bytes): Data to encrypt
+        
+        Returns:
+            bytes: Encrypted data
+        """
+        num_blocks = (len(plaintext) + 15) // 16
+        if num_blocks == 0:
+            return b""
+        keystream = parallel_ctr_keystream(self.counter, 0, num_blocks,
+                                           self.round_keys, self.aes.rounds)
+        data = np.frombuffer(plaintext, dtype=np.uint8)
+        return (data ^ keystream.reshape(-1)[:len(data)]).tobytes()
+
+    def decrypt(self, ciphertext):
+        """
+        Decrypt data using parallel AES-CTR (the same operation as encrypt).
+        
+        Args:
+            ciphertext (bytes): Data to decrypt
+        
+        Returns:
+            bytes: Decrypted data
+        """
+        return self.encrypt(ciphertext)
+
+
 # Modified AES_CBC class with parallel processing
 class AES_CBC_Parallel:
     """
@@ -62,6 +257,7 @@ class AES_CBC_Parallel:
         
         self.aes = AES(key, key_size)
         self.iv = iv
+        self.round_keys = flatten_round_keys(self.aes)
 
     def encrypt(self, plaintext):
         """
@@ -108,28 +304,20 @@ class AES_CBC_Parallel:
         if len(ciphertext) % 16 != 0:
             raise ValueError("Ciphertext length must be a multiple of 16 bytes")
         
-        blocks = [ciphertext[i:i+16] for i in range(0, len(ciphertext), 16)]
+        if not ciphertext:
+            raise ValueError("Ciphertext must not be empty")
+        
+        blocks = np.frombuffer(ciphertext, dtype=np.uint8).reshape(-1, 16)
         
         # For decryption, we can parallelize the AES block decryption
         # because XOR with previous block can be done after decryption
-        decrypted_blocks = []
+        decrypted_blocks = parallel_decrypt_blocks(blocks, self.round_keys, self.aes.rounds)
         
-        # Parallelize the decryption of blocks
-        for block in blocks:
-            decrypted_block = self.aes.decrypt(block)
-            decrypted_blocks.append(decrypted_block)
+        # XOR with previous ciphertext block (or IV for first block)
+        decrypted_blocks[0] ^= np.frombuffer(self.iv, dtype=np.uint8)
+        decrypted_blocks[1:] ^= blocks[:-1]
         
-        # Now apply CBC mode sequentially
-        plaintext = bytearray()
-        prev_block = self.iv
-        
-        for i, decrypted_block in enumerate(decrypted_blocks):
-            # XOR with previous ciphertext block (or IV for first block)
-            xored = bytes(x ^ y for x, y in zip(decrypted_block, prev_block))
-            plaintext.extend(xored)
-            prev_block = blocks[i]
-        
-        return unpad_pkcs7(bytes(plaintext))
+        return unpad_pkcs7(decrypted_blocks.tobytes())
 
 
 # Example of parallel processing for multiple independent messages
@@ -137,6 +325,10 @@ def parallel_encrypt_messages(aes_obj, messages, ivs):
     """
     Encrypt multiple independent messages in parallel.
     
+    Block i of every message is encrypted in the same batched call (see
+    multi_buffer_cbc_encrypt), which gives close to ECB throughput for many
+    short messages on a single core.
+    
     Args:
         aes_obj: AES object
         messages: List of plaintext messages
@@ -145,20 +337,7 @@ def parallel_encrypt_messages(aes_obj, messages, ivs):
     Returns:
         List of encrypted messages
     """
-    import concurrent.futures
-    
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        # Create a CBC encryptor for each message with its own IV
-        encryptors = [AES_CBC(aes_obj.key, iv) for iv in ivs]
-        
-        # Submit encryption tasks to the executor
-        futures = [executor.submit(encryptor.encrypt, message) 
-                  for encryptor, message in zip(encryptors, messages)]
-        
-        # Collect results
-        results = [future.result() for future in futures]
-        
-    return results
+    return multi_buffer_cbc_encrypt(aes_obj, messages, ivs)
 
 # Example usage
 if __name__ == "__main__":
@@ -196,6 +375,15 @@ if __name__ == "__main__":
     assert decrypted == decrypted_parallel, "Parallel implementation gave different results!"
     print("Encryption and decryption successful!")
     
+    # Counter mode: both directions are fully parallel
+    aes_ctr_parallel = AES_CTR_Parallel(key, iv)
+    start = time.time()
+    ciphertext_ctr = aes_ctr_parallel.encrypt(plaintext)
+    decrypted_ctr = aes_ctr_parallel.decrypt(ciphertext_ctr)
+    end = time.time()
+    print(f"Parallel CTR implementation: {end - start:.4f} seconds")
+    assert decrypted_ctr == plaintext, "CTR decryption failed!"
+    
     # Example of parallel processing for multiple messages
     messages = [plaintext] * 10  # 10 copies of the same message
     ivs = [os.urandom(16) for _ in range(10)]  # Different IV for each message
@@ -203,4 +391,5 @@ if __name__ == "__main__":
     start = time.time()
     encrypted_messages = parallel_encrypt_messages(aes_cbc.aes, messages, ivs)
     end = time.time()
-    print(f"Parallel encryption of 10 independent messages: {end - start:.4f} seconds")
\ No newline at end of file
+    print(f"Parallel encryption of 10 independent messages: {end - start:.4f} seconds")
+    assert encrypted_messages[3] == AES_CBC(key, ivs[3]).encrypt(messages[3]), "Multi-buffer encryption failed!"
\ No newline at end of file
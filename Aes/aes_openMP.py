@@ -1,15 +1,80 @@
 
 import os
-import numpy as np
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Pool, cpu_count, shared_memory
+
+# Keep the original AES implementation for the core algorithm; NumPy is
+# optional and only imported once a large input needs it
+if __package__:
+    from ._lazy import optional_module
+    from .AES import AES, pad_pkcs7, unpad_pkcs7, xor_bytes
+else:
+    from _lazy import optional_module
+    from AES import AES, pad_pkcs7, unpad_pkcs7, xor_bytes
+
+np = optional_module("numpy")
+
+# Per-process AES object, set once by _init_worker when the pool starts
+_worker_aes = None
+
+
+def _init_worker(key, key_size):
+    """Pool initializer: expand the key once per worker process."""
+    global _worker_aes
+    _worker_aes = AES(key, key_size)
+
+
+def _decrypt_chunk(aes, chunk):
+    """Decrypt a run of independent 16-byte blocks (ECB)."""
+    if np is not None and len(chunk) >= 16 * 32:
+        blocks = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 16)
+        return aes.decrypt_blocks(blocks).tobytes()
+    return b"".join(aes.decrypt(chunk[i:i+16]) for i in range(0, len(chunk), 16))
+
+
+def _cbc_decrypt_range(aes, src, dst, start, end):
+    """
+    CBC-decrypt blocks [start, end) from src into dst.
+    
+    src holds the IV followed by the ciphertext, so block i of the
+    ciphertext sits at src block i + 1 and its chaining value at src block i.
+    Plaintext block i is written to dst block i.
+    """
+    if np is not None:
+        count = 16 * (end - start)
+        cipher_blocks = np.frombuffer(src, dtype=np.uint8, count=count, offset=16 * (start + 1))
+        prev_blocks = np.frombuffer(src, dtype=np.uint8, count=count, offset=16 * start)
+        out = np.frombuffer(dst, dtype=np.uint8, count=count, offset=16 * start)
+        out[:] = aes.decrypt_blocks(cipher_blocks.reshape(-1, 16)).reshape(-1) ^ prev_blocks
+        return
+    
+    for i in range(start, end):
+        decrypted = aes.decrypt(src[16*(i+1):16*(i+2)])
+        dst[16*i:16*(i+1)] = xor_bytes(decrypted, src[16*i:16*(i+1)])
+
+
+def _decrypt_range(args):
+    """Pool task: CBC-decrypt one block range between shared memory segments."""
+    src_name, dst_name, start, end = args
+    src = shared_memory.SharedMemory(name=src_name)
+    dst = shared_memory.SharedMemory(name=dst_name)
+    try:
+        _cbc_decrypt_range(_worker_aes, src.buf, dst.buf, start, end)
+    finally:
+        src.close()
+        dst.close()
 
-# Keep the original AES implementation for the core algorithm
-from AES import AES, pad_pkcs7, unpad_pkcs7
 
 class ParallelAES_CBC:
     """
     AES in Cipher Block Chaining (CBC) mode with parallel processing for multiple blocks.
+    
+    The worker pool is started on first use and kept for the lifetime of the
+    object; each worker expands the key once when it starts. Call close() or
+    use the object as a context manager to shut the pool down.
     """
+    # Inputs with fewer blocks than this are decrypted in the calling process
+    parallel_threshold = 64
+
     def __init__(self, key, iv, key_size=128, num_threads=None):
         """
         Initialize parallel AES-CBC with key and initialization vector.
@@ -26,84 +91,48 @@ class ParallelAES_CBC:
         self.aes = AES(key, key_size)
         self.iv = iv
         self.num_threads = num_threads if num_threads else cpu_count()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self):
+        """Return the worker pool, starting it on first use."""
+        if self._pool is None:
+            self._pool = Pool(processes=self.num_threads, initializer=_init_worker,
+                              initargs=(self.aes.key, self.aes.key_size))
+        return self._pool
 
     def encrypt(self, plaintext):
         """
-        Encrypt data using parallelized AES-CBC.
+        Encrypt data using AES-CBC.
         
-        For CBC mode, we can parallelize using the following approach:
-        1. First block is processed normally with the IV
-        2. For subsequent blocks, we process them in parallel once 
-           the previous blocks are computed
+        Each block is chained to the previous ciphertext block, so CBC
+        encryption of a single message is inherently serial and runs in the
+        calling process.
         """
         plaintext_padded = pad_pkcs7(plaintext)
-        blocks = [plaintext_padded[i:i+16] for i in range(0, len(plaintext_padded), 16)]
         
-        # For small inputs, use sequential processing
-        if len(blocks) <= 2:
-            # Use the standard implementation for small inputs
-            ciphertext = bytearray()
-            prev_block = self.iv
-            
-            for block in blocks:
-                xored = bytes(x ^ y for x, y in zip(block, prev_block))
-                encrypted_block = self.aes.encrypt(xored)
-                ciphertext.extend(encrypted_block)
-                prev_block = encrypted_block
-            
-            return bytes(ciphertext)
-        
-        # For larger inputs, use parallel processing
-        # First block must be processed sequentially with IV
-        xored = bytes(x ^ y for x, y in zip(blocks[0], self.iv))
-        first_encrypted = self.aes.encrypt(xored)
-        ciphertext = bytearray(first_encrypted)
-        
-        # Process remaining blocks in parallel batches
-        remaining_blocks = blocks[1:]
-        block_count = len(remaining_blocks)
+        ciphertext = bytearray()
+        prev_block = self.iv
         
-        # Process in batches to maintain chain dependencies but enable parallelism
-        batch_size = min(self.num_threads, block_count)
-        for i in range(0, block_count, batch_size):
-            batch_end = min(i + batch_size, block_count)
-            batch_blocks = remaining_blocks[i:batch_end]
-            
-            # Get the previous encrypted block for this batch
-            prev_encrypted = first_encrypted if i == 0 else results[-1]
-            
-            # Create tasks for parallel processing
-            results = []
-            with Pool(processes=min(self.num_threads, len(batch_blocks))) as pool:
-                tasks = []
-                for j, block in enumerate(batch_blocks):
-                    if j == 0:
-                        # First block in batch uses the previous encrypted block
-                        tasks.append((block, prev_encrypted))
-                    else:
-                        # Later blocks need to wait - we'll handle them sequentially
-                        pass
-                
-                # Process the first block of the batch
-                if tasks:
-                    first_result = pool.apply(self._encrypt_block, args=tasks[0])
-                    results.append(first_result)
-                    
-                    # Process remaining blocks in the batch sequentially
-                    for j in range(1, len(batch_blocks)):
-                        next_result = self._encrypt_block(batch_blocks[j], results[-1])
-                        results.append(next_result)
-            
-            # Add batch results to ciphertext
-            ciphertext.extend(b''.join(results))
+        for i in range(0, len(plaintext_padded), 16):
+            encrypted_block = self.aes.encrypt(xor_bytes(plaintext_padded[i:i+16], prev_block))
+            ciphertext.extend(encrypted_block)
+            prev_block = encrypted_block
         
         return bytes(ciphertext)
 
-    def _encrypt_block(self, block, prev_block):
-        """Helper function to encrypt a single block."""
-        xored = bytes(x ^ y for x, y in zip(block, prev_block))
-        return self.aes.encrypt(xored)
-
     def decrypt(self, ciphertext):
         """
         Decrypt data using parallelized AES-CBC.
@@ -115,37 +144,36 @@ class ParallelAES_CBC:
         if len(ciphertext) % 16 != 0:
             raise ValueError("Ciphertext length must be a multiple of 16 bytes")
         
-        blocks = [ciphertext[i:i+16] for i in range(0, len(ciphertext), 16)]
-        block_count = len(blocks)
+        block_count = len(ciphertext) // 16
         
         # For small inputs, use sequential processing
-        if block_count <= 2:
-            plaintext = bytearray()
-            prev_block = self.iv
+        if block_count < self.parallel_threshold or self.num_threads <= 1:
+            decrypted = _decrypt_chunk(self.aes, ciphertext)
+            plaintext = xor_bytes(decrypted, (self.iv + ciphertext)[:len(ciphertext)])
+            return unpad_pkcs7(plaintext)
+        
+        # Workers read the IV and ciphertext from one shared segment and write
+        # plaintext straight into another, so only block offsets are pickled
+        src = shared_memory.SharedMemory(create=True, size=16 + len(ciphertext))
+        dst = shared_memory.SharedMemory(create=True, size=len(ciphertext))
+        try:
+            src.buf[:16] = self.iv
+            src.buf[16:16 + len(ciphertext)] = ciphertext
             
-            for block in blocks:
-                decrypted_block = self.aes.decrypt(block)
-                xored = bytes(x ^ y for x, y in zip(decrypted_block, prev_block))
-                plaintext.extend(xored)
-                prev_block = block
+            # One contiguous block range per worker
+            per_worker = -(-block_count // self.num_threads)
+            tasks = [(src.name, dst.name, start, min(start + per_worker, block_count))
+                     for start in range(0, block_count, per_worker)]
+            self._get_pool().map(_decrypt_range, tasks)
             
-            return unpad_pkcs7(bytes(plaintext))
-        
-        # For larger inputs, we can parallelize the decrypt operations
-        with Pool(processes=min(self.num_threads, block_count)) as pool:
-            # Parallelize the decryption of blocks
-            decrypted_blocks = pool.map(self.aes.decrypt, blocks)
-        
-        # XOR with previous blocks (must be done sequentially)
-        plaintext = bytearray()
-        prev_block = self.iv
-        
-        for i, decrypted in enumerate(decrypted_blocks):
-            xored = bytes(x ^ y for x, y in zip(decrypted, prev_block))
-            plaintext.extend(xored)
-            prev_block = blocks[i]
+            plaintext = bytes(dst.buf[:len(ciphertext)])
+        finally:
+            src.close()
+            src.unlink()
+            dst.close()
+            dst.unlink()
         
-        return unpad_pkcs7(bytes(plaintext))
+        return unpad_pkcs7(plaintext)
 
 
 # Cython implementation for even better performance
@@ -236,9 +264,9 @@ if __name__ == "__main__":
     
     # Parallel implementation
     start_time = time.time()
-    aes_parallel = ParallelAES_CBC(key, iv)
-    ciphertext_parallel = aes_parallel.encrypt(plaintext)
-    decrypted_parallel = aes_parallel.decrypt(ciphertext_parallel)
+    with ParallelAES_CBC(key, iv) as aes_parallel:
+        ciphertext_parallel = aes_parallel.encrypt(plaintext)
+        decrypted_parallel = aes_parallel.decrypt(ciphertext_parallel)
     parallel_time = time.time() - start_time
     print(f"Parallel implementation time: {parallel_time:.4f} seconds")
     
@@ -0,0 +1,78 @@
+"""
+Import-time budget check for the Aes package.
+
+Imports the package in fresh interpreters and fails if the fastest import
+is over budget, or if it loads a dependency that should only be imported
+on first use. Run from anywhere:
+
+    python Aes/check_import_time.py [--budget-ms 5] [--runs 7]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules that `import Aes` must not load
+HEAVY_MODULES = ("numpy", "numba", "pycuda", "multiprocessing")
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import Aes
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+print(" ".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure_import(runs=7):
+    """
+    Time `import Aes` in fresh interpreters.
+    
+    Bytecode caching is left on, as for an installed package, and one
+    warm-up run fills the cache before timing.
+    
+    Args:
+        runs (int): Number of timed imports
+    
+    Returns:
+        tuple: (fastest import in ms, list of heavy modules that were loaded)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    probe = _PROBE.format(heavy=HEAVY_MODULES)
+    
+    times = []
+    loaded = set()
+    for _ in range(runs + 1):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=root, env=env,
+                                capture_output=True, text=True, check=True).stdout.split("\n")
+        times.append(float(output[0]))
+        loaded.update(output[1].split())
+    return min(times[1:]), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of the Aes package")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="allowed import time")
+    parser.add_argument("--runs", type=int, default=7, help="number of timed imports")
+    args = parser.parse_args(argv)
+    
+    best, loaded = measure_import(args.runs)
+    print(f"import Aes: {best:.2f} ms (budget {args.budget_ms:.2f} ms)")
+    
+    failed = False
+    if best > args.budget_ms:
+        print("FAIL: import time is over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: import loaded {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
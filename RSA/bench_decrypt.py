@@ -0,0 +1,57 @@
+# bench_decrypt.py
+"""
+Decryption latency: plain pow(c, d, n) against the CRT private key.
+
+RSAPrivateKey.decrypt_int runs two half-size exponentiations, recombines
+them with Garner's formula and checks the result with m^e == c. Prints
+p50 and best latency of each for one generated key, with the Python
+version and machine, since the ratio depends on both.
+
+    python bench_decrypt.py [--bits 2048] [--runs 30] [--blinding]
+"""
+import argparse
+import platform
+import random
+import time
+
+from server import generate_keypair
+from bench_keygen import percentile
+
+def measure(decrypt, ciphertexts):
+    """Sorted wall-clock times of one decrypt call per ciphertext"""
+    times = []
+    for c in ciphertexts:
+        start = time.perf_counter()
+        decrypt(c)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RSA decryption")
+    parser.add_argument("--bits", type=int, default=2048, help="modulus size")
+    parser.add_argument("--runs", type=int, default=30, help="decryptions per variant")
+    parser.add_argument("--blinding", action="store_true", help="blind the CRT decryptions")
+    parser.add_argument("--seed", type=int, help="seed the random module for repeatable runs")
+    args = parser.parse_args(argv)
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    _, private_key = generate_keypair(args.bits, blinding=args.blinding)
+    n, d = private_key
+    ciphertexts = [random.randrange(2, n) for _ in range(args.runs)]
+    
+    results = {
+        "pow(c, d, n)": measure(lambda c: pow(c, d, n), ciphertexts),
+        "crt": measure(private_key.decrypt_int, ciphertexts),
+    }
+    
+    print(f"{args.bits}-bit key, {args.runs} runs each, blinding {'on' if args.blinding else 'off'}, "
+          f"Python {platform.python_version()} on {platform.machine()}")
+    print(f"{'':14} {'p50':>10} {'best':>10}")
+    for name, times in results.items():
+        print(f"{name:14} {1e3 * percentile(times, 50):8.1f}ms {1e3 * times[0]:8.1f}ms")
+    ratio = percentile(results["pow(c, d, n)"], 50) / percentile(results["crt"], 50)
+    print(f"p50 speedup: {ratio:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_keygen.py
+"""
+Key generation latency: the original prime search against the sieved one.
+
+The original search draws a fresh random candidate after every miss and
+runs Miller-Rabin on each; server.generate_prime sieves a window of
+candidates first. Prints p50/p99/max latency of generate_keypair for both.
+
+    python bench_keygen.py [--bits 2048] [--runs 50]
+"""
+import argparse
+import random
+import time
+
+from server import RSAPrivateKey, generate_keypair, is_prime
+
+def legacy_generate_prime(bits):
+    """The original generate_prime: a fresh candidate and a full is_prime per try"""
+    while True:
+        p = random.getrandbits(bits)
+        p |= (1 << bits - 1) | 1
+        if is_prime(p):
+            return p
+
+def legacy_generate_keypair(bits):
+    """generate_keypair with the original prime search"""
+    p = legacy_generate_prime(bits // 2)
+    q = legacy_generate_prime(bits // 2)
+    while p == q:
+        q = legacy_generate_prime(bits // 2)
+    return RSAPrivateKey(p, q)
+
+def percentile(sorted_times, pct):
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, -(-len(sorted_times) * pct // 100))
+    return sorted_times[rank - 1]
+
+def measure(keygen, bits, runs):
+    """Sorted wall-clock times of runs key generations"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        keygen(bits)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RSA key generation")
+    parser.add_argument("--bits", type=int, default=2048, help="modulus size")
+    parser.add_argument("--runs", type=int, default=50, help="key generations per variant")
+    parser.add_argument("--seed", type=int, help="seed the random module for repeatable runs")
+    args = parser.parse_args(argv)
+    
+    results = {}
+    for name, keygen in (("original", legacy_generate_keypair), ("sieved", generate_keypair)):
+        if args.seed is not None:
+            random.seed(args.seed)
+        results[name] = measure(keygen, args.bits, args.runs)
+    
+    print(f"{args.bits}-bit keys, {args.runs} runs each")
+    print(f"{'':10} {'p50':>10} {'p99':>10} {'max':>10}")
+    for name, times in results.items():
+        print(f"{name:10} " + " ".join(f"{1e3 * t:8.1f}ms" for t in
+                                       (percentile(times, 50), percentile(times, 99), times[-1])))
+    for pct in (50, 99):
+        ratio = percentile(results["original"], pct) / percentile(results["sieved"], pct)
+        print(f"p{pct} speedup: {ratio:.2f}x")
+
+if __name__ == "__main__":
+    main()
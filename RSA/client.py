@@ -3,6 +3,8 @@ import socket
 import pickle
 import sys
 
+from envelope import envelope_encrypt
+
 def encrypt(public_key, message):
     """Encrypt message using public key"""
     n, e = public_key
@@ -31,8 +33,9 @@ def main():
         print("Connected to server")
         
        
-        data = client_socket.recv(4096)
-        public_key = pickle.loads(data)
+        # Read whole pickles from the stream; envelopes can exceed one recv()
+        reader = client_socket.makefile('rb')
+        public_key = pickle.load(reader)
         print(f"Received server public key: {public_key}")
         
         while True:
@@ -43,22 +46,25 @@ def main():
             
             message_int = int.from_bytes(message.encode(), 'big')
             if message_int >= public_key[0]:
-                print("Message too long for key size, please enter a shorter message")
-                continue
-            
-          
-            encrypted_message = encrypt(public_key, message)
-            print(f"Encrypted message: {encrypted_message}")
-            client_socket.send(pickle.dumps(encrypted_message))
+                # Too long for RSA alone: RSA-encrypt a fresh AES key and AES-encrypt the message
+                encrypted_message = envelope_encrypt(public_key, message.encode())
+                print(f"Encrypted message into an envelope of {len(encrypted_message)} bytes")
+            else:
+                encrypted_message = encrypt(public_key, message)
+                print(f"Encrypted message: {encrypted_message}")
+            client_socket.sendall(pickle.dumps(encrypted_message))
             
             
-            data = client_socket.recv(4096)
-            if not data:
+            try:
+                encrypted_response = pickle.load(reader)
+            except EOFError:
                 print("Server disconnected")
                 break
                 
-            encrypted_response = pickle.loads(data)
-            print(f"Received encrypted response: {encrypted_response}")
+            if isinstance(encrypted_response, bytes):
+                print(f"Received encrypted response envelope of {len(encrypted_response)} bytes")
+            else:
+                print(f"Received encrypted response: {encrypted_response}")
             
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,242 @@
+# envelope.py
+"""
+Hybrid RSA + AES envelope encryption for payloads of any size.
+
+A random 32-byte secret is RSA-encrypted once per message (OAEP with
+SHA-256), and the body is encrypted with AES from Aes/AES.py in CTR or CBC
+mode under a key derived from that secret, so RSA is paid once and large
+payloads run at AES speed. An HMAC-SHA256 tag over the header and the
+ciphertext authenticates the whole envelope.
+
+Layout:
+    b"RSAE" | version (1) | mode (1) | AES key bytes (1) |
+    wrapped key length (2) | RSA-OAEP(secret) | IV (16) |
+    AES ciphertext | HMAC-SHA256 tag (32)
+"""
+import hashlib
+import hmac
+import io
+import os
+import struct
+import sys
+
+try:
+    from Aes import AES_CBC, AES_CTR, xor_bytes
+except ImportError:
+    # Run from the RSA directory: the Aes package lives next to it
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    from Aes import AES_CBC, AES_CTR, xor_bytes
+
+MAGIC = b"RSAE"
+VERSION = 1
+MODES = {"ctr": 0, "cbc": 1}
+HEADER = struct.Struct(">4sBBBH")
+TAG_SIZE = 32
+SECRET_SIZE = 32
+
+# Bytes of body encrypted per step of the streaming functions (a multiple of 16)
+CHUNK_SIZE = 1 << 20
+
+def _mgf1(seed, length):
+    """MGF1 mask generation with SHA-256"""
+    mask = b""
+    counter = 0
+    while len(mask) < length:
+        mask += hashlib.sha256(seed + counter.to_bytes(4, "big")).digest()
+        counter += 1
+    return mask[:length]
+
+def oaep_encrypt(public_key, message, label=b""):
+    """RSA-OAEP (SHA-256) encryption of a short byte string, as k bytes"""
+    n, e = public_key
+    k = (n.bit_length() + 7) // 8
+    h_len = hashlib.sha256().digest_size
+    if len(message) > k - 2 * h_len - 2:
+        raise ValueError("Message too long for key size")
+    
+    data_block = (hashlib.sha256(label).digest() + bytes(k - len(message) - 2 * h_len - 2) +
+                  b"\x01" + message)
+    seed = os.urandom(h_len)
+    masked_db = xor_bytes(data_block, _mgf1(seed, len(data_block)))
+    masked_seed = xor_bytes(seed, _mgf1(masked_db, h_len))
+    encoded = int.from_bytes(b"\x00" + masked_seed + masked_db, "big")
+    return pow(encoded, e, n).to_bytes(k, "big")
+
+def oaep_decrypt(private_key, ciphertext, label=b""):
+    """RSA-OAEP (SHA-256) decryption; private_key is an RSAPrivateKey or (n, d)"""
+    if hasattr(private_key, "decrypt_int"):
+        n = private_key.n
+        decrypt_int = private_key.decrypt_int
+    else:
+        n, d = private_key
+        def decrypt_int(c):
+            return pow(c, d, n)
+    k = (n.bit_length() + 7) // 8
+    h_len = hashlib.sha256().digest_size
+    c = int.from_bytes(ciphertext, "big")
+    if len(ciphertext) != k or c >= n or k < 2 * h_len + 2:
+        raise ValueError("Decryption error")
+    
+    encoded = decrypt_int(c).to_bytes(k, "big")
+    masked_seed = encoded[1:1 + h_len]
+    masked_db = encoded[1 + h_len:]
+    seed = xor_bytes(masked_seed, _mgf1(masked_db, h_len))
+    data_block = xor_bytes(masked_db, _mgf1(seed, len(masked_db)))
+    # Check every part before deciding, and give one error for all failures
+    separator = data_block.find(b"\x01", h_len)
+    valid = (encoded[0] == 0 and separator != -1 and
+             hmac.compare_digest(data_block[:h_len], hashlib.sha256(label).digest()) and
+             not any(data_block[h_len:separator]))
+    if not valid:
+        raise ValueError("Decryption error")
+    return data_block[separator + 1:]
+
+def _read_exact(src, size):
+    """Read size bytes, looping over short reads; fewer only at end of stream"""
+    data = b""
+    while len(data) < size:
+        chunk = src.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def _derive_keys(secret, key_size):
+    """AES key and HMAC key from the wrapped secret"""
+    aes_key = hmac.new(secret, b"envelope aes key", hashlib.sha256).digest()[:key_size // 8]
+    mac_key = hmac.new(secret, b"envelope mac key", hashlib.sha256).digest()
+    return aes_key, mac_key
+
+def _body_cipher(mode, aes_key, iv, decrypt):
+    """Return update(chunk), finalize() and close() callables for the body cipher"""
+    if mode == "cbc":
+        cbc = AES_CBC(aes_key, iv, len(aes_key) * 8)
+        stream = cbc.decryptor() if decrypt else cbc.encryptor()
+        return stream.update, stream.finalize, lambda: None
+    
+    # CTR: each chunk continues the keystream at the byte where the previous
+    # one stopped, so chunks of any length work (a short read from a pipe or
+    # socket ends mid-block). One worker: a pool started per message costs
+    # more than it saves, and forking it here would race the KeyPool thread
+    # in server.py
+    ctr = AES_CTR(aes_key, iv, len(aes_key) * 8, num_workers=1)
+    position = [0]
+    def update(chunk):
+        block, skip = divmod(position[0], 16)
+        position[0] += len(chunk)
+        # Pad the front of a chunk that starts mid-block to line it up with the keystream
+        return ctr.encrypt_at(block, bytes(skip) + chunk)[skip:]
+    return update, lambda: b"", ctr.close
+
+def envelope_encrypt_stream(public_key, src, dst, mode="ctr", key_size=128, chunk_size=CHUNK_SIZE):
+    """
+    Encrypt the binary stream src into an envelope written to dst
+    
+    Returns the number of plaintext bytes read.
+    """
+    if mode not in MODES:
+        raise ValueError("Mode must be ctr or cbc")
+    if key_size not in (128, 192, 256):
+        raise ValueError("Key size must be 128, 192, or 256 bits")
+    if chunk_size <= 0 or chunk_size % 16:
+        raise ValueError("Chunk size must be a positive multiple of 16 bytes")
+    
+    secret = os.urandom(SECRET_SIZE)
+    aes_key, mac_key = _derive_keys(secret, key_size)
+    iv = os.urandom(16)
+    wrapped = oaep_encrypt(public_key, secret)
+    header = HEADER.pack(MAGIC, VERSION, MODES[mode], key_size // 8, len(wrapped)) + wrapped + iv
+    
+    mac = hmac.new(mac_key, header, hashlib.sha256)
+    dst.write(header)
+    update, finalize, close = _body_cipher(mode, aes_key, iv, decrypt=False)
+    total = 0
+    try:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+            output = update(chunk)
+            mac.update(output)
+            dst.write(output)
+        output = finalize()
+    finally:
+        close()
+    mac.update(output)
+    dst.write(output + mac.digest())
+    return total
+
+def envelope_decrypt_stream(private_key, src, dst, chunk_size=CHUNK_SIZE):
+    """
+    Decrypt an envelope read from the binary stream src into dst
+    
+    The tag can only be checked at the end, so plaintext is written before
+    the envelope is known to be authentic: if a ValueError is raised,
+    everything written to dst must be discarded. Returns the number of
+    plaintext bytes written.
+    """
+    fixed = _read_exact(src, HEADER.size)
+    if len(fixed) != HEADER.size:
+        raise ValueError("Envelope is truncated")
+    magic, version, mode_id, key_bytes, key_length = HEADER.unpack(fixed)
+    if magic != MAGIC or version != VERSION or mode_id not in MODES.values():
+        raise ValueError("Not a version 1 envelope")
+    if key_bytes not in (16, 24, 32):
+        raise ValueError("Invalid AES key size in envelope")
+    wrapped = _read_exact(src, key_length)
+    iv = _read_exact(src, 16)
+    if len(wrapped) != key_length or len(iv) != 16:
+        raise ValueError("Envelope is truncated")
+    
+    secret = oaep_decrypt(private_key, wrapped)
+    if len(secret) != SECRET_SIZE:
+        raise ValueError("Decryption error")
+    aes_key, mac_key = _derive_keys(secret, key_bytes * 8)
+    mode = "cbc" if mode_id == MODES["cbc"] else "ctr"
+    
+    mac = hmac.new(mac_key, fixed + wrapped + iv, hashlib.sha256)
+    update, finalize, close = _body_cipher(mode, aes_key, iv, decrypt=True)
+    try:
+        # The last TAG_SIZE bytes are the tag, so always hold them back
+        pending = b""
+        total = 0
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+            body = pending[:max(0, len(pending) - TAG_SIZE)]
+            body = body[:len(body) - len(body) % 16]
+            pending = pending[len(body):]
+            if body:
+                mac.update(body)
+                output = update(body)
+                total += len(output)
+                dst.write(output)
+        
+        if len(pending) < TAG_SIZE:
+            raise ValueError("Envelope is truncated")
+        body, tag = pending[:-TAG_SIZE], pending[-TAG_SIZE:]
+        mac.update(body)
+        if not hmac.compare_digest(mac.digest(), tag):
+            raise ValueError("Envelope authentication failed")
+        output = update(body) + finalize()
+    finally:
+        close()
+    dst.write(output)
+    return total + len(output)
+
+def envelope_encrypt(public_key, data, mode="ctr", key_size=128):
+    """Encrypt bytes of any length into an envelope"""
+    dst = io.BytesIO()
+    envelope_encrypt_stream(public_key, io.BytesIO(data), dst, mode, key_size,
+                            chunk_size=max(16, len(data) + 15) // 16 * 16)
+    return dst.getvalue()
+
+def envelope_decrypt(private_key, envelope):
+    """Decrypt and authenticate an envelope, returning the plaintext bytes"""
+    dst = io.BytesIO()
+    envelope_decrypt_stream(private_key, io.BytesIO(envelope), dst,
+                            chunk_size=max(16, len(envelope) + 15) // 16 * 16)
+    return dst.getvalue()
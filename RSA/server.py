@@ -1,8 +1,18 @@
 # server.py
+import mmap
+import multiprocessing
+import os
 import socket
 import pickle
+import queue
 import random
-from math import gcd
+import struct
+import sys
+import threading
+from collections import deque
+from math import gcd, isqrt
+
+from envelope import envelope_decrypt, envelope_encrypt
 
 def is_prime(n, k=5):
     """Miller-Rabin primality test"""
@@ -33,15 +43,255 @@ def is_prime(n, k=5):
             return False
     return True
 
+def _sieve_primes(limit):
+    """All primes below limit (sieve of Eratosthenes)"""
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = bytes(len(range(i*i, limit, i)))
+    return [i for i in range(limit) if sieve[i]]
+
+# The 3512 primes below 2^15, used for trial division
+SMALL_PRIMES = _sieve_primes(1 << 15)
+
+# Miller-Rabin with the first 13 primes as bases is deterministic below this bound
+DETERMINISTIC_MR_LIMIT = 3317044064679887385961981
+
+# Odd candidates sieved per window in generate_prime
+SIEVE_WINDOW = 4096
+
+# Seconds generate_prime_pair waits for a prime before checking its workers are alive
+PRIME_POLL_INTERVAL = 1.0
+
+# The server's key history (newest last) and its spare keys for rotation
+KEY_STORE_PATH = "server_keys.bin"
+SPARE_KEYS_PATH = "server_spare_keys.bin"
+
+def _miller_rabin(n, a):
+    """One strong probable-prime test of odd n > 3 to base a"""
+    r, d = 0, n - 1
+    while d % 2 == 0:
+        r += 1
+        d //= 2
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(r - 1):
+        x = pow(x, 2, n)
+        if x == n - 1:
+            return True
+    return False
+
+def _jacobi(a, n):
+    """Jacobi symbol (a/n) for odd n > 0"""
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+def _strong_lucas(n):
+    """Strong Lucas probable-prime test of odd n > 3, with Selfridge's parameters"""
+    if isqrt(n) ** 2 == n:
+        return False
+    # First D in 5, -7, 9, -11, ... with (D/n) = -1
+    D = 5
+    while True:
+        j = _jacobi(D, n)
+        if j == -1:
+            break
+        if j == 0 and abs(D) != n:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+    P, Q = 1, (1 - D) // 4
+    
+    # n + 1 = d * 2^s with d odd
+    s, d = 0, n + 1
+    while d % 2 == 0:
+        s += 1
+        d //= 2
+    
+    # U_k, V_k and Q^k by binary expansion of d, halving mod n where needed
+    U, V, Qk = 1, P, Q % n
+    for bit in bin(d)[3:]:
+        U = U * V % n
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if bit == "1":
+            U, V = (P * U + V) % n, (D * U + P * V) % n
+            U = (U + n if U & 1 else U) >> 1
+            V = (V + n if V & 1 else V) >> 1
+            Qk = Qk * Q % n
+    
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        if V == 0:
+            return True
+        Qk = Qk * Qk % n
+    return False
+
+def is_probable_prime(n):
+    """
+    Trial division by SMALL_PRIMES, then Miller-Rabin and a strong Lucas test.
+    
+    Below DETERMINISTIC_MR_LIMIT, Miller-Rabin with the first 13 primes as
+    bases decides primality exactly. Larger n get Miller-Rabin with bases
+    2, 3, 5 and 7 plus the strong Lucas test (a Baillie-PSW test), for
+    which no composite is known to pass.
+    """
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+    if n < DETERMINISTIC_MR_LIMIT:
+        return all(_miller_rabin(n, a) for a in SMALL_PRIMES[:13])
+    return all(_miller_rabin(n, a) for a in (2, 3, 5, 7)) and _strong_lucas(n)
+
+def _search_window(start, bits, cancelled=None):
+    """
+    Sieve SIEVE_WINDOW odd candidates from odd start and return the first
+    prime of the given bit length with its top two bits set, or None.
+    cancelled() is polled before each primality test so a search that has
+    lost a race stops early.
+    """
+    # sieve[i] stays 1 while start + 2*i has no factor in SMALL_PRIMES
+    sieve = bytearray([1]) * SIEVE_WINDOW
+    for p in SMALL_PRIMES[1:]:
+        # First i with start + 2*i = 0 (mod p); (p + 1) // 2 is the inverse of 2
+        i = -(start % p) * ((p + 1) // 2) % p
+        sieve[i::p] = bytes(len(range(i, SIEVE_WINDOW, p)))
+    
+    i = sieve.find(1)
+    while i != -1:
+        candidate = start + 2 * i
+        if candidate >> bits - 2 != 3:
+            return None
+        if cancelled is not None and cancelled():
+            return None
+        if is_probable_prime(candidate):
+            return candidate
+        i = sieve.find(1, i + 1)
+    return None
+
 def generate_prime(bits):
-    """Generate a prime number with specified number of bits"""
+    """
+    Generate a prime number with specified number of bits
+    
+    Incremental search: from one random odd start, a window of SIEVE_WINDOW
+    odd candidates is sieved against SMALL_PRIMES in a bytearray, and only
+    the survivors (about 7% of them) go to the primality test.
+    
+    The top two bits are always set, so the product of two such primes has
+    exactly twice as many bits.
+    """
+    if bits < 16:
+        # Too short to sieve; every candidate would hit a small prime
+        while True:
+            p = random.getrandbits(bits) | (3 << bits - 2) | 1
+            if is_probable_prime(p):
+                return p
+    
     while True:
-        p = random.getrandbits(bits)
-        # Ensure the number is odd and has the right bit length
-        p |= (1 << bits - 1) | 1
-        if is_prime(p):
+        start = random.getrandbits(bits)
+        # Ensure the number is odd and has its top two bits set
+        start |= (3 << bits - 2) | 1
+        p = _search_window(start, bits)
+        if p is not None:
             return p
 
+def _prime_race_worker(bits, bases, next_window, done, found, first_race):
+    """
+    Process target for generate_prime_pair: claim windows from the races
+    that are still open, starting with first_race, and report primes.
+    
+    Window k of a race starts 2 * SIEVE_WINDOW * k above the race's base,
+    wrapping within [3 * 2^(bits-2), 2^bits), the numbers with their top two
+    bits set, so no two workers ever sieve the same candidates.
+    """
+    low = 3 << bits - 2
+    span = 1 << bits - 2
+    races = (first_race, 1 - first_race)
+    while True:
+        race = next((r for r in races if not done[r]), None)
+        if race is None:
+            return
+        with next_window.get_lock():
+            k = next_window[race]
+            next_window[race] += 1
+        start = low + (bases[race] - low + 2 * SIEVE_WINDOW * k) % span
+        prime = _search_window(start, bits, lambda: done[race])
+        if prime is not None:
+            found.put((race, prime))
+
+def generate_prime_pair(bits, workers=None):
+    """
+    Generate two primes with specified number of bits using worker processes
+    
+    Each prime has its own race: a random base, from which the workers take
+    disjoint windows of candidates. Workers start split between the two
+    races; when a race is won its losers are cancelled and move on to the
+    other race, and all workers stop once both primes are found. The two
+    bases are independent, so p and q are not close to each other.
+    
+    Raises RuntimeError if a worker dies (killed for memory, say): it may
+    have held a shared lock, so the others cannot be relied on to finish.
+    
+    Workers are forked, unless other threads are running (a KeyPool's, say):
+    a fork copies any lock those threads hold, still held, so then the
+    workers are started as fresh interpreters ("spawn") instead.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or bits < 64:
+        return generate_prime(bits), generate_prime(bits)
+    
+    bases = [random.getrandbits(bits) | (3 << bits - 2) | 1 for _ in range(2)]
+    context = multiprocessing.get_context("spawn" if threading.active_count() > 1 else None)
+    next_window = context.Array('q', 2)
+    done = context.RawArray('b', 2)
+    found = context.Queue()
+    processes = [context.Process(target=_prime_race_worker,
+                                 args=(bits, bases, next_window, done, found, w % 2),
+                                 daemon=True)
+                 for w in range(workers)]
+    for process in processes:
+        process.start()
+    
+    primes = [None, None]
+    try:
+        while None in primes:
+            try:
+                race, prime = found.get(timeout=PRIME_POLL_INTERVAL)
+            except queue.Empty:
+                # Workers only exit once both primes are in, so any exit is a failure
+                exitcodes = [process.exitcode for process in processes if not process.is_alive()]
+                if exitcodes:
+                    raise RuntimeError(f"Prime search worker exited with code {exitcodes[0]}")
+                continue
+            if primes[race] is None:
+                primes[race] = prime
+                done[race] = 1
+    finally:
+        done[0] = done[1] = 1
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    return primes[0], primes[1]
+
 def mod_inverse(e, phi):
     """Calculate the modular multiplicative inverse"""
     def extended_gcd(a, b):
@@ -57,27 +307,360 @@ def mod_inverse(e, phi):
     else:
         return x % phi
 
-def generate_keypair(bits=1024):
-    """Generate RSA key pair"""
-    # Generate two distinct prime numbers
-    p = generate_prime(bits // 2)
-    q = generate_prime(bits // 2)
-    while p == q:
-        q = generate_prime(bits // 2)
+class RSAPrivateKey:
+    """
+    RSA private key that keeps its factors for CRT decryption.
+    
+    Decryption does two half-size exponentiations, mod p and mod q, and
+    recombines them with Garner's formula, which is 3-4x faster than one
+    exponentiation mod n. Each result is checked against the public
+    exponent before it is returned, so a faulty computation cannot leak a
+    factor of n. With blinding enabled the ciphertext is multiplied by r^e
+    before decryption and the result by r^-1 afterwards; the pair is
+    squared after each use, so a fresh r is only needed once.
+    
+    Unpacks as (n, d) like the tuple keys used before.
+    """
+    def __init__(self, p, q, e=65537, blinding=False):
+        """
+        Args:
+            p (int): First prime factor
+            q (int): Second prime factor
+            e (int): Public exponent
+            blinding (bool): Blind every decryption with a random factor
+        """
+        if p == q:
+            raise ValueError("p and q must be distinct")
+        self.p = p
+        self.q = q
+        self.n = p * q
+        self.e = e
+        self.d = mod_inverse(e, (p - 1) * (q - 1))
+        # CRT exponents and coefficient; pow(q, -1, p) avoids the recursion
+        # depth of mod_inverse on two full-size numbers
+        self.dP = self.d % (p - 1)
+        self.dQ = self.d % (q - 1)
+        self.qInv = pow(q, -1, p)
+        self.blinding = blinding
+        self._blinding_pair = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_components(cls, p, q, e, d, dP, dQ, qInv, blinding=False):
+        """Build a key from stored components without recomputing any of them"""
+        key = cls.__new__(cls)
+        key.p, key.q, key.n, key.e, key.d = p, q, p * q, e, d
+        key.dP, key.dQ, key.qInv = dP, dQ, qInv
+        key.blinding = blinding
+        key._blinding_pair = None
+        key._lock = threading.Lock()
+        return key
+
+    def __iter__(self):
+        return iter((self.n, self.d))
+
+    def __repr__(self):
+        return f"RSAPrivateKey(n={self.n.bit_length()} bits, e={self.e})"
+
+    @property
+    def public_key(self):
+        """The matching (n, e) public key."""
+        return (self.n, self.e)
+
+    def decrypt_int(self, ciphertext):
+        """Decrypt an integer ciphertext with CRT, blinding it if enabled"""
+        if not 0 <= ciphertext < self.n:
+            raise ValueError("Ciphertext out of range for key size")
+        if not self.blinding:
+            return self._crt(ciphertext)
+        
+        blind, unblind = self._next_blinding_pair()
+        return self._crt(ciphertext * blind % self.n) * unblind % self.n
+
+    def _crt(self, c):
+        """c^d mod n from c^dP mod p and c^dQ mod q (Garner), with a fault check"""
+        m1 = pow(c % self.p, self.dP, self.p)
+        m2 = pow(c % self.q, self.dQ, self.q)
+        h = self.qInv * (m1 - m2) % self.p
+        m = m2 + h * self.q
+        if pow(m, self.e, self.n) != c:
+            raise ValueError("RSA-CRT fault detected; result discarded")
+        return m
+
+    def _next_blinding_pair(self):
+        """Return (r^e, r^-1) mod n and advance the stored pair to its square"""
+        with self._lock:
+            if self._blinding_pair is None:
+                while True:
+                    r = random.SystemRandom().randrange(2, self.n - 1)
+                    if gcd(r, self.n) == 1:
+                        break
+                self._blinding_pair = (pow(r, self.e, self.n), pow(r, -1, self.n))
+            blind, unblind = self._blinding_pair
+            self._blinding_pair = (blind * blind % self.n, unblind * unblind % self.n)
+        return blind, unblind
+
+def generate_keypair(bits=1024, blinding=False, workers=1):
+    """
+    Generate RSA key pair
+    
+    bits is the modulus size; workers > 1 searches for p and q in that many
+    processes (None for one per CPU); blinding enables blinded decryption
+    on the private key.
+    """
+    # Common choice for e; it needs gcd(e, phi) = 1, so when p - 1 or q - 1
+    # is a multiple of e (about 1 pair in 33000) new primes are drawn rather
+    # than a random e, which would not fit the KeyStore's 4-byte e field
+    e = 65537
+    while True:
+        # Generate two distinct prime numbers
+        p, q = generate_prime_pair(bits // 2, workers)
+        if p != q and gcd(e, (p - 1) * (q - 1)) == 1:
+            break
     
     n = p * q
-    phi = (p - 1) * (q - 1)
     
-    # Choose e such that 1 < e < phi and gcd(e, phi) = 1
-    e = 65537  # Common choice for e
-    while gcd(e, phi) != 1:
-        e = random.randrange(2, phi)
+    # The private key computes d, the modular multiplicative inverse of e
+    # (mod phi), and keeps p and q for CRT decryption
+    private_key = RSAPrivateKey(p, q, e, blinding)
     
-    # Compute d, the modular multiplicative inverse of e (mod phi)
-    d = mod_inverse(e, phi)
+    # Public key: (n, e), Private key: RSAPrivateKey (unpacks as (n, d))
+    return ((n, e), private_key)
+
+class KeyStore:
+    """
+    Append-only file of RSA private keys in a compact binary format.
     
-    # Public key: (n, e), Private key: (n, d)
-    return ((n, e), (n, d))
+    A 16-byte header (magic, version, prime size in bytes) is followed by
+    fixed-size records holding e, p, q, d, dP, dQ and qInv as big-endian
+    integers, so key i is read straight out of an mmap of the file at a
+    known offset and loading needs no modular arithmetic. The file is
+    created readable by its owner only.
+    """
+    MAGIC = b"RSAKEYS\0"
+    VERSION = 1
+    HEADER = struct.Struct(">8sII")
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Key file, created on the first append or replace
+        """
+        self.path = path
+
+    def __len__(self):
+        prime_bytes = self._read_header()
+        if prime_bytes is None:
+            return 0
+        size = os.path.getsize(self.path) - self.HEADER.size
+        # A record cut short by a crash during an append is ignored
+        return size // self._record_size(prime_bytes)
+
+    def load(self, index=-1, blinding=False):
+        """Load key number index (the newest by default) as an RSAPrivateKey"""
+        count = len(self)
+        if not -count <= index < count:
+            raise IndexError("Key index out of range")
+        return self._load_range(index % count, 1, blinding)[0]
+
+    def load_all(self, blinding=False):
+        """Load every key in the file, oldest first"""
+        return self._load_range(0, len(self), blinding)
+
+    def append(self, private_key):
+        """Add a key at the end of the file"""
+        prime_bytes = self._read_header()
+        if prime_bytes is None or not len(self):
+            self.replace([private_key])
+            return
+        record = self._pack(private_key, prime_bytes)
+        offset = self.HEADER.size + len(self) * self._record_size(prime_bytes)
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            # Drop any record cut short by an earlier crash before writing
+            os.ftruncate(fd, offset)
+            os.pwrite(fd, record, offset)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def replace(self, private_keys):
+        """Atomically replace the file's contents with private_keys"""
+        if private_keys:
+            prime_bytes = max((max(key.p, key.q).bit_length() + 7) // 8 for key in private_keys)
+        else:
+            prime_bytes = self._read_header() or 0
+        data = self.HEADER.pack(self.MAGIC, self.VERSION, prime_bytes) + b"".join(
+            self._pack(key, prime_bytes) for key in private_keys)
+        
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.path)
+
+    def _record_size(self, prime_bytes):
+        # e, then p, q, dP, dQ and qInv at prime size and d at modulus size
+        return 4 + 7 * prime_bytes
+
+    def _read_header(self):
+        """Prime size in bytes from the header, or None if there is no file yet"""
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(self.HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(header) != self.HEADER.size:
+            raise ValueError(f"{self.path} is not a key store")
+        magic, version, prime_bytes = self.HEADER.unpack(header)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{self.path} is not a version {self.VERSION} key store")
+        return prime_bytes
+
+    def _pack(self, key, prime_bytes):
+        """Serialize one key as a record"""
+        if not 0 < key.e < 1 << 32:
+            raise ValueError("Public exponent does not fit the store's 4-byte e field")
+        try:
+            return (key.e.to_bytes(4, "big") +
+                    b"".join(x.to_bytes(prime_bytes, "big") for x in (key.p, key.q)) +
+                    key.d.to_bytes(2 * prime_bytes, "big") +
+                    b"".join(x.to_bytes(prime_bytes, "big") for x in (key.dP, key.dQ, key.qInv)))
+        except OverflowError:
+            raise ValueError("Key is larger than the keys in this store")
+
+    def _load_range(self, first, count, blinding):
+        """Read count consecutive records from an mmap of the file"""
+        prime_bytes = self._read_header()
+        if not count:
+            return []
+        record_size = self._record_size(prime_bytes)
+        keys = []
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            offset = self.HEADER.size + first * record_size
+            for _ in range(count):
+                e = int.from_bytes(m[offset:offset + 4], "big")
+                offset += 4
+                fields = []
+                for size in (1, 1, 2, 1, 1, 1):
+                    fields.append(int.from_bytes(m[offset:offset + size * prime_bytes], "big"))
+                    offset += size * prime_bytes
+                p, q, d, dP, dQ, qInv = fields
+                keys.append(RSAPrivateKey.from_components(p, q, e, d, dP, dQ, qInv, blinding))
+        return keys
+
+class KeyPool:
+    """
+    Pool of pre-generated RSA key pairs, kept topped up by a background thread.
+    
+    get() hands out a key pair immediately while the pool has one, and the
+    thread then generates a replacement. With a KeyStore the spare keys are
+    written to disk whenever the pool changes and reloaded on start, so a
+    restarted process has ephemeral keys ready at once; keys handed out are
+    removed from the store and never handed out twice.
+    
+    If generating or saving a key fails, the thread stops and records the
+    error; get() hands out the keys still in the pool and then raises it.
+    """
+    def __init__(self, bits=1024, size=4, workers=1, store=None):
+        """
+        Args:
+            bits (int): Modulus size of the generated keys
+            size (int): Number of spare keys to keep
+            workers (int): Worker processes per key generation (see generate_keypair)
+            store (KeyStore): File to keep the spare keys in across restarts
+        """
+        self.bits = bits
+        self.size = size
+        self.workers = workers
+        self.store = store
+        self._keys = deque(store.load_all() if store is not None else ())
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._error = None
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._keys)
+
+    def start(self):
+        """Start the background generator thread"""
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the generator thread once its current key is finished"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def get(self, timeout=None):
+        """
+        Take a key pair, waiting up to timeout seconds if the pool is empty
+        
+        Raises the generator thread's error once the pool is empty and no
+        more keys are coming.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._keys or self._error is not None, timeout):
+                raise TimeoutError("No key available in the pool")
+            if not self._keys:
+                raise self._error
+            private_key = self._keys.popleft()
+            self._save()
+            self._cond.notify_all()
+        return private_key.public_key, private_key
+
+    def _fill(self):
+        """Generator thread: keep the pool at size keys"""
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped or len(self._keys) < self.size)
+                    if self._stopped:
+                        return
+                # Generate without the lock, so get() is never held up
+                _, private_key = generate_keypair(self.bits, workers=self.workers)
+                with self._cond:
+                    self._keys.append(private_key)
+                    self._save()
+                    self._cond.notify_all()
+        except Exception as e:
+            # Wake every waiting get() so it raises instead of waiting forever
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+
+    def _save(self):
+        if self.store is not None:
+            self.store.replace(list(self._keys))
+
+def load_or_create_key(store, bits=1024, workers=None):
+    """Load the newest key from store, generating and saving one if it is empty"""
+    if len(store):
+        private_key = store.load()
+    else:
+        _, private_key = generate_keypair(bits, workers=workers)
+        store.append(private_key)
+    return private_key.public_key, private_key
+
+def rotate_key(store, pool):
+    """Replace the current key in store with a fresh key from pool"""
+    public_key, private_key = pool.get()
+    store.append(private_key)
+    return public_key, private_key
 
 def encrypt(public_key, message):
     """Encrypt message using public key"""
@@ -92,16 +675,28 @@ def encrypt(public_key, message):
 
 def decrypt(private_key, ciphertext):
     """Decrypt ciphertext using private key"""
-    n, d = private_key
-    # Decrypt using modular exponentiation
-    message_int = pow(ciphertext, d, n)
+    if isinstance(private_key, RSAPrivateKey):
+        # Two half-size exponentiations via CRT
+        message_int = private_key.decrypt_int(ciphertext)
+    else:
+        n, d = private_key
+        # Decrypt using modular exponentiation
+        message_int = pow(ciphertext, d, n)
     # Convert integer back to bytes and then to string
     message_bytes = message_int.to_bytes((message_int.bit_length() + 7) // 8, 'big')
     return message_bytes.decode('utf-8', errors='ignore')
 
 def main():
-    # Generate RSA keys
-    public_key, private_key = generate_keypair()
+    # Load the persisted RSA key (generating it on the first run) and keep
+    # spare keys ready for rotation in the background; the key is made
+    # before the pool's thread starts, while its prime search can still fork
+    store = KeyStore(KEY_STORE_PATH)
+    rotate = "--rotate" in sys.argv[1:]
+    if not rotate:
+        public_key, private_key = load_or_create_key(store)
+    pool = KeyPool(size=2, store=KeyStore(SPARE_KEYS_PATH)).start()
+    if rotate:
+        public_key, private_key = rotate_key(store, pool)
     print(f"Server started with public key: {public_key}")
     
     # Create a socket server
@@ -118,31 +713,44 @@ def main():
     # Send public key to client
     client_socket.send(pickle.dumps(public_key))
     
+    # Messages are read as whole pickles from the stream, so an envelope
+    # larger than one recv() still arrives in one piece
+    reader = client_socket.makefile('rb')
+    
     try:
         while True:
             # Receive encrypted message from client
-            data = client_socket.recv(4096)
-            if not data:
+            try:
+                encrypted_message = pickle.load(reader)
+            except EOFError:
                 break
             
-            encrypted_message = pickle.loads(data)
-            print(f"Received encrypted message: {encrypted_message}")
-            
-            # Decrypt the message
-            decrypted_message = decrypt(private_key, encrypted_message)
+            # Decrypt the message; bytes are an RSA + AES envelope for a
+            # message too long for the key, ints are plain RSA ciphertexts
+            if isinstance(encrypted_message, bytes):
+                print(f"Received envelope of {len(encrypted_message)} bytes")
+                decrypted_message = envelope_decrypt(private_key, encrypted_message).decode('utf-8', errors='ignore')
+            else:
+                print(f"Received encrypted message: {encrypted_message}")
+                decrypted_message = decrypt(private_key, encrypted_message)
             print(f"Decrypted message: {decrypted_message}")
             
-            # Encrypt and send a response
+            # Encrypt and send a response, in an envelope if it does not fit the key
             response = f"Server received: {decrypted_message}"
-            encrypted_response = encrypt(public_key, response)
-            client_socket.send(pickle.dumps(encrypted_response))
+            try:
+                encrypted_response = encrypt(public_key, response)
+            except ValueError:
+                encrypted_response = envelope_encrypt(public_key, response.encode())
+            client_socket.sendall(pickle.dumps(encrypted_response))
     
     except Exception as e:
         print(f"Error: {e}")
     
     finally:
+        reader.close()
         client_socket.close()
         server_socket.close()
+        pool.close()
         print("Server shutdown")
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+# test_envelope.py
+"""
+Envelope streams must give the same result whatever sizes their reads return.
+
+    python -m unittest test_envelope
+"""
+import io
+import os
+import unittest
+
+from envelope import envelope_decrypt, envelope_decrypt_stream, envelope_encrypt_stream
+from server import generate_keypair
+
+class ShortReader(io.RawIOBase):
+    """Unbuffered stream whose reads return fewer bytes than asked, like a pipe or socket"""
+    def __init__(self, data, sizes=(1, 7, 16, 33, 100, 4095)):
+        self.data = memoryview(data)
+        self.sizes = sizes
+        self.reads = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        n = self.sizes[self.reads % len(self.sizes)]
+        self.reads += 1
+        chunk = bytes(self.data[:min(n, size) if size >= 0 else n])
+        self.data = self.data[len(chunk):]
+        return chunk
+
+class ShortReadTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.public_key, cls.private_key = generate_keypair(1024)
+        cls.data = os.urandom(20000)
+
+    def test_encrypt_from_short_reads(self):
+        """Chunks that end mid-block must not shift the keystream"""
+        for mode in ("ctr", "cbc"):
+            with self.subTest(mode=mode):
+                src = ShortReader(self.data)
+                dst = io.BytesIO()
+                envelope_encrypt_stream(self.public_key, src, dst, mode=mode, chunk_size=4096)
+                self.assertGreater(src.reads, len(self.data) // 4096 + 1)
+                self.assertEqual(envelope_decrypt(self.private_key, dst.getvalue()), self.data)
+
+    def test_decrypt_from_short_reads(self):
+        for mode in ("ctr", "cbc"):
+            with self.subTest(mode=mode):
+                envelope = io.BytesIO()
+                envelope_encrypt_stream(self.public_key, io.BytesIO(self.data), envelope, mode=mode)
+                dst = io.BytesIO()
+                envelope_decrypt_stream(self.private_key, ShortReader(envelope.getvalue()), dst,
+                                        chunk_size=4096)
+                self.assertEqual(dst.getvalue(), self.data)
+
+if __name__ == "__main__":
+    unittest.main()
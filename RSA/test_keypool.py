@@ -0,0 +1,53 @@
+# test_keypool.py
+"""
+KeyPool must report generator failures instead of leaving get() waiting.
+
+    python -m unittest test_keypool
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import server
+from server import KeyPool, KeyStore
+
+class KeyPoolFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_keygen_failure_is_raised_by_get(self):
+        """A failing generate_keypair wakes get() with its error"""
+        with mock.patch.object(server, "generate_keypair", side_effect=OSError("injected")):
+            with KeyPool(bits=256, size=1) as pool:
+                with self.assertRaisesRegex(OSError, "injected"):
+                    pool.get(timeout=30)
+                # The thread has stopped, so later calls fail at once too
+                with self.assertRaisesRegex(OSError, "injected"):
+                    pool.get(timeout=30)
+
+    def test_spare_keys_are_handed_out_before_the_error(self):
+        """Keys already in the pool are still served after the thread fails"""
+        store = KeyStore(os.path.join(self.tmp.name, "spares.bin"))
+        _, spare = server.generate_keypair(256)
+        store.replace([spare])
+        
+        with mock.patch.object(server, "generate_keypair", side_effect=RuntimeError("injected")):
+            with KeyPool(bits=256, size=2, store=store) as pool:
+                public_key, private_key = pool.get(timeout=30)
+                self.assertEqual(private_key.n, spare.n)
+                self.assertEqual(public_key, spare.public_key)
+                with self.assertRaisesRegex(RuntimeError, "injected"):
+                    pool.get(timeout=30)
+
+    def test_store_failure_is_raised_by_get(self):
+        """A failing store write (disk full, say) also stops the pool cleanly"""
+        store = KeyStore(os.path.join(self.tmp.name, "spares.bin"))
+        with mock.patch.object(KeyStore, "replace", side_effect=OSError(28, "No space left on device")):
+            with KeyPool(bits=256, size=1, store=store) as pool:
+                with self.assertRaises(OSError):
+                    pool.get(timeout=30)
+
+if __name__ == "__main__":
+    unittest.main()